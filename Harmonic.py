@@ -1,108 +1,253 @@
+"""
+C-type harmonic filter calculator.
+Features:
+- Broadcast phasor solver for L in series with C1 || (R + C2) over harmonics and designs
+- Result table with magnitudes and angles of every voltage and current
+- Voltage and current plots rendered off-screen (matplotlib Figure objects, no pyplot)
+- Batch CLI over a file of filter cases, run in a process pool with per-case outputs
+
+Cases file columns: case, L, C1, C2, R, and either spectrum (CSV with Harmonic and
+Voltage columns, relative to the cases file) or harmonics and voltages as
+semicolon-separated lists; f_base is optional (default 50). Each case's outputs go to a
+folder named after it: the name is cut down to one path component, and a repeated name gets
+its row number appended.
+"""
+
+import argparse
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
 import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
+from matplotlib.figure import Figure
+
+# Phasors solved for every harmonic, in output column order
+QUANTITIES = ["I_source", "V_L", "V_C1", "V_R", "V_C2", "I_C1", "I_branch"]
+
+def c_type_filter_arrays(harmonics, V_harmonics, L, C1, C2, R, f_base=50):
+    """
+    Broadcast C-type filter solver.
+
+    Harmonics (and their source voltages) run along the last axis; L, C1, C2 and R may be
+    scalars or equal-length arrays of candidate designs, which run along the first axis.
+    Returns a dict with the frequencies and the magnitudes and angles (degrees) of every
+    quantity in QUANTITIES, stacked as arrays shaped (quantity, candidate, harmonic).
+    """
+    h = np.asarray(harmonics)
+    V = np.asarray(V_harmonics)
+    L, C1, C2, R = (np.asarray(x, dtype=float)[..., np.newaxis] for x in (L, C1, C2, R))
+    f = h * f_base
+    omega = 2 * np.pi * f
+
+    # Impedances
+    Z_L = 1j * omega * L
+    Y_C1 = 1j * omega * C1
+    Z_C2 = 1 / (1j * omega * C2)
+
+    # Damping branch (R + C2 in series) in parallel with C1, all in series with L
+    Z_branch = R + Z_C2
+    Z_parallel = 1 / (Y_C1 + 1 / Z_branch)
+    Z_total = Z_L + Z_parallel
+
+    I_source = V / Z_total
+    V_L = I_source * Z_L
+    V_node = V - V_L
+    I_branch = V_node / Z_branch
+
+    phasors = np.stack(np.broadcast_arrays(
+        I_source, V_L, V_node, I_branch * R, I_branch * Z_C2, V_node * Y_C1, I_branch))
+    return {
+        "Harmonic": h,
+        "Frequency (Hz)": f,
+        "V_source_mag": np.abs(V),
+        "magnitude": np.abs(phasors),
+        "angle": np.angle(phasors, deg=True),
+    }
 
 def c_type_filter_voltages(harmonics, V_harmonics, L, C1, C2, R, f_base=50):
     """
     Calculate voltages and currents for a C-type harmonic filter, including phase angles.
     """
-    results = []
-
-    for h, V in zip(harmonics, V_harmonics):
-        f = h * f_base
-        omega = 2 * np.pi * f
-        
-        # Impedances
-        Z_L = 1j * omega * L
-        Z_C1 = 1 / (1j * omega * C1)
-        Z_C2 = 1 / (1j * omega * C2)
-        Z_R = R
-        
-        # Damping branch impedance (R + C2 in series)
-        Z_branch = Z_R + Z_C2
-        
-        # Parallel combination of C1 and damping branch
-        Z_parallel = 1 / (1/Z_C1 + 1/Z_branch)
-        
-        # Total impedance: L in series with parallel network
-        Z_total = Z_L + Z_parallel
-        
-        # Source current
-        I_source = V / Z_total
-        
-        # Node voltage
-        V_node = V - I_source * Z_L
-        
-        # Branch currents
-        I_C1 = V_node / Z_C1
-        I_branch = V_node / Z_branch
-        
-        # Voltages across components
-        V_L = I_source * Z_L
-        V_C1 = V_node
-        V_R = I_branch * Z_R
-        V_C2 = I_branch * Z_C2
-        
-        # Helper for magnitude and angle
-        def mag_angle(x):
-            return abs(x), np.angle(x, deg=True)
-        
-        results.append({
-            "Harmonic": h,
-            "Frequency (Hz)": f,
-            "V_source_mag": abs(V),
-            "I_source_mag": mag_angle(I_source)[0],
-            "I_source_angle": mag_angle(I_source)[1],
-            "V_L_mag": mag_angle(V_L)[0],
-            "V_L_angle": mag_angle(V_L)[1],
-            "V_C1_mag": mag_angle(V_C1)[0],
-            "V_C1_angle": mag_angle(V_C1)[1],
-            "V_R_mag": mag_angle(V_R)[0],
-            "V_R_angle": mag_angle(V_R)[1],
-            "V_C2_mag": mag_angle(V_C2)[0],
-            "V_C2_angle": mag_angle(V_C2)[1],
-            "I_C1_mag": mag_angle(I_C1)[0],
-            "I_C1_angle": mag_angle(I_C1)[1],
-            "I_branch_mag": mag_angle(I_branch)[0],
-            "I_branch_angle": mag_angle(I_branch)[1]
-        })
-    
-    return pd.DataFrame(results)
-
-# Example usage
-harmonics = [1, 3, 5, 7]
-V_harmonics = [230, 10, 5, 3]
-L = 0.01      # H
-C1 = 100e-6   # F
-C2 = 50e-6    # F
-R = 0.5       # Ohms
-
-df = c_type_filter_voltages(harmonics, V_harmonics, L, C1, C2, R)
-
-# Export to Excel
-df.to_excel("c_type_filter_results.xlsx", index=False)
-
-# Plot voltages
-plt.figure(figsize=(10,6))
-plt.plot(df["Harmonic"], df["V_L_mag"], label="V_L")
-plt.plot(df["Harmonic"], df["V_C1_mag"], label="V_C1")
-plt.plot(df["Harmonic"], df["V_R_mag"], label="V_R")
-plt.plot(df["Harmonic"], df["V_C2_mag"], label="V_C2")
-plt.xlabel("Harmonic Order")
-plt.ylabel("Voltage Magnitude (V)")
-plt.title("Voltages Across Components")
-plt.legend()
-plt.grid(True)
-plt.show()
-
-# Plot currents
-plt.figure(figsize=(10,6))
-plt.plot(df["Harmonic"], df["I_source_mag"], label="I_source")
-plt.plot(df["Harmonic"], df["I_C1_mag"], label="I_C1")
-plt.plot(df["Harmonic"], df["I_branch_mag"], label="I_branch")
-plt.xlabel("Harmonic Order")
-plt.ylabel("Current Magnitude (A)")
-plt.title("Currents in Filter")
-plt.legend()
-plt.grid(True)
-plt.show()
\ No newline at end of file
+    result = c_type_filter_arrays(harmonics, V_harmonics, L, C1, C2, R, f_base)
+    columns = {
+        "Harmonic": result["Harmonic"],
+        "Frequency (Hz)": result["Frequency (Hz)"],
+        "V_source_mag": result["V_source_mag"],
+    }
+    for i, name in enumerate(QUANTITIES):
+        columns[f"{name}_mag"] = result["magnitude"][i]
+        columns[f"{name}_angle"] = result["angle"][i]
+    return pd.DataFrame(columns)
+
+# ---------------- Plots ---------------- #
+
+VOLTAGE_TRACES = ["V_L", "V_C1", "V_R", "V_C2"]
+CURRENT_TRACES = ["I_source", "I_C1", "I_branch"]
+
+def plot_magnitudes(df, names, ylabel, title, fig=None):
+    """
+    Magnitudes of the named quantities against harmonic order, drawn on fig or on a new
+    off-screen Figure that needs no display and is safe to use in worker processes.
+    """
+    fig = fig or Figure(figsize=(10, 6))
+    ax = fig.add_subplot()
+    for name in names:
+        ax.plot(df["Harmonic"], df[f"{name}_mag"], label=name)
+    ax.set_xlabel("Harmonic Order")
+    ax.set_ylabel(ylabel)
+    ax.set_title(title)
+    ax.legend()
+    ax.grid(True)
+    return fig
+
+def build_figures(df, new_figure=None):
+    # new_figure() may supply pyplot figures for interactive display
+    new_figure = new_figure or (lambda: None)
+    return {
+        "voltages": plot_magnitudes(df, VOLTAGE_TRACES, "Voltage Magnitude (V)", "Voltages Across Components",
+                                    new_figure()),
+        "currents": plot_magnitudes(df, CURRENT_TRACES, "Current Magnitude (A)", "Currents in Filter", new_figure()),
+    }
+
+def save_figures(figures, out_dir=".", formats=("png",)):
+    paths = []
+    for name, fig in figures.items():
+        for fmt in formats:
+            path = os.path.join(out_dir, f"{name}.{fmt}")
+            fig.savefig(path)
+            paths.append(path)
+    return paths
+
+# ---------------- Batch Runs ---------------- #
+
+def _split(text):
+    return [float(v) for v in str(text).split(";") if v.strip()]
+
+def _value(row, key, default):
+    # Missing columns and blank cells (NaN from pandas) both take the default
+    value = row.get(key, default)
+    return default if pd.isna(value) else value
+
+def _folder_name(name):
+    # One path component: separators become "__", "." and ".." are dropped
+    parts = [p for p in re.split(r"[\\/]+", name) if p not in ("", ".", "..")]
+    return "__".join(parts) or "case"
+
+def load_cases(path):
+    """
+    Read a cases file into a list of dicts with harmonics and voltages resolved. A malformed
+    row becomes a case with an "Error" entry, reported by run_case, instead of aborting the batch.
+    """
+    base = os.path.dirname(os.path.abspath(path))
+    cases = []
+    seen = set()
+    for i, row in enumerate(pd.read_csv(path).to_dict("records")):
+        name = _folder_name(str(_value(row, "case", f"case_{i + 1}")))
+        if name in seen:
+            # Pool workers would otherwise write the same folder at the same time
+            name = f"{name}_row{i + 1}"
+        while name in seen:
+            name += "_"
+        seen.add(name)
+        case = {"case": name}
+        try:
+            case["f_base"] = float(_value(row, "f_base", 50))
+            case.update({k: float(row[k]) for k in ("L", "C1", "C2", "R")})
+            spectrum = _value(row, "spectrum", "")
+            if spectrum:
+                df_csv = pd.read_csv(os.path.join(base, str(spectrum)))
+                case["harmonics"], case["V_harmonics"] = df_csv["Harmonic"].tolist(), df_csv["Voltage"].tolist()
+            else:
+                case["harmonics"], case["V_harmonics"] = _split(row["harmonics"]), _split(row["voltages"])
+        except Exception as e:
+            case["Error"] = f"{type(e).__name__}: {e}"
+        cases.append(case)
+    return cases
+
+def run_case(case, out_dir, results_format="xlsx", plot_formats=("png",)):
+    """Solve one filter case and write its table and plots to out_dir; errors are recorded, not raised."""
+    summary = {"case": case["case"]}
+    if case.get("Error"):
+        summary.update({"Output": "", "Error": case["Error"]})
+        return summary
+    try:
+        os.makedirs(out_dir, exist_ok=True)
+        df = c_type_filter_voltages(case["harmonics"], case["V_harmonics"], case["L"], case["C1"],
+                                    case["C2"], case["R"], case.get("f_base", 50))
+        results_path = os.path.join(out_dir, f"c_type_filter_results.{results_format}")
+        if results_format == "xlsx":
+            df.to_excel(results_path, index=False)
+        else:
+            df.to_csv(results_path, index=False)
+        if plot_formats:
+            save_figures(build_figures(df), out_dir, plot_formats)
+        summary.update({"Max I_source (A)": df["I_source_mag"].max(), "Max V_C1 (V)": df["V_C1_mag"].max(),
+                        "Output": results_path, "Error": ""})
+    except Exception as e:
+        summary.update({"Output": "", "Error": f"{type(e).__name__}: {e}"})
+    return summary
+
+def _run_case(args):
+    case, out_root, results_format, plot_formats = args
+    return run_case(case, os.path.join(out_root, case["case"]), results_format, plot_formats)
+
+def run_cases(cases, out_root, workers=None, results_format="xlsx", plot_formats=("png",)):
+    """Run every case across a process pool. Returns (summary DataFrame, elapsed seconds)."""
+    started = time.perf_counter()
+    tasks = [(case, out_root, results_format, plot_formats) for case in cases]
+    if workers == 1:
+        summaries = [_run_case(t) for t in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            summaries = list(pool.map(_run_case, tasks))
+    return pd.DataFrame(summaries), time.perf_counter() - started
+
+# ---------------- CLI Mode ---------------- #
+
+EXAMPLE_CASE = {"case": "example", "harmonics": [1, 3, 5, 7], "V_harmonics": [230, 10, 5, 3],
+                "L": 0.01, "C1": 100e-6, "C2": 50e-6, "R": 0.5, "f_base": 50}
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="C-type filter voltages and currents for one or many cases.")
+    parser.add_argument("cases", nargs="?", help="Cases CSV (default: the built-in example, written to the current folder)")
+    parser.add_argument("--out", default="c_type_filter_runs", help="Output directory for a cases file")
+    parser.add_argument("--workers", type=int, help="Worker processes (default: all cores)")
+    parser.add_argument("--format", default="xlsx", choices=["xlsx", "csv"], help="Results table format")
+    parser.add_argument("--plots", default="png", help="Plot formats, e.g. png,svg,pdf, or none")
+    parser.add_argument("--show", action="store_true", help="Also open the example plots in a window")
+    args = parser.parse_args(argv)
+    plot_formats = () if args.plots.strip().lower() == "none" else tuple(
+        f.strip().lower() for f in args.plots.split(",") if f.strip())
+
+    if args.cases is None:
+        summary = run_case(EXAMPLE_CASE, ".", args.format, plot_formats)
+        if summary["Error"]:
+            print(summary["Error"])
+            return 1
+        print(f"Results saved to {summary['Output']}")
+        if args.show:
+            import matplotlib.pyplot as plt
+            case = EXAMPLE_CASE
+            df = c_type_filter_voltages(case["harmonics"], case["V_harmonics"], case["L"], case["C1"], case["C2"], case["R"])
+            build_figures(df, lambda: plt.figure(figsize=(10, 6)))
+            plt.show()
+        return 0
+
+    cases = load_cases(args.cases)
+    if not cases:
+        print(f"No cases in {args.cases}", file=sys.stderr)
+        return 1
+    os.makedirs(args.out, exist_ok=True)
+    summary, elapsed = run_cases(cases, args.out, args.workers, args.format, plot_formats)
+    summary_path = os.path.join(args.out, "c_type_summary.csv")
+    summary.to_csv(summary_path, index=False)
+    failed = summary[summary["Error"] != ""]
+    print(f"{len(cases)} cases in {elapsed:.2f} s ({len(cases) / max(elapsed, 1e-9):.1f} cases/s), "
+          f"{len(failed)} failed. Summary saved to {summary_path}")
+    return 1 if len(failed) else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -5,17 +5,26 @@ Features:
 - Manual input or CSV import for harmonic spectrum
 - Series and shunt configurations
 - THD calculation for voltage and current
-- Save THD values in CSV output
-- Generate plots (current, voltage, combined) and save as PNG and JSON
+- Typed numeric spectrum table plus a separate THD summary (CSV, or Parquet/Arrow with pyarrow)
+- Generate plots (current, voltage, combined) and save as PNG, JSON and/or HTML in the background
 - Display THD in CLI and GUI outputs
+- GUI work runs on a background thread with progress and cancel
+- Vectorized NumPy core for large spectra and many (C, L, R) parameter sets
+- Adaptive frequency scan for resonances (harmonic_scan.py)
+- Non-interactive parallel batch mode over many spectrum files (harmonic_batch.py)
 """
 
+import numpy as np
 import pandas as pd
 import plotly.graph_objects as go
 import tkinter as tk
-from tkinter import filedialog, messagebox
+from tkinter import filedialog, messagebox, ttk
+import os
 import sys
 import math
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
 
 # ---------------- Utility Functions ---------------- #
 
@@ -43,25 +52,77 @@ def calculate_thd(values):
     numerator = math.sqrt(sum(v**2 for v in harmonics))
     return (numerator / fundamental) * 100 if fundamental != 0 else 0.0
 
-def generate_plots(df, config):
+# ---------------- Vectorized Functions ---------------- #
+# Harmonics run along the last axis and (C, L, R) parameter sets along the first,
+# so scalar parameters give arrays shaped like the spectrum and 1-D parameter arrays
+# give (cases, harmonics) arrays.
+
+def calculate_impedances_array(fundamental_freq, harmonics, C, L, R):
+    f_h = np.asarray(harmonics, dtype=float) * fundamental_freq
+    C = np.asarray(C, dtype=float)[..., np.newaxis]
+    L = np.asarray(L, dtype=float)[..., np.newaxis]
+    R = np.asarray(R, dtype=float)[..., np.newaxis]
+    with np.errstate(divide='ignore'):
+        X_C = np.where(C > 0, 1 / (2 * np.pi * f_h * C), np.inf)
+    X_L = np.where(L > 0, 2 * np.pi * f_h * L, 0.0)
+    return X_C, X_L, np.broadcast_to(R, X_L.shape)
+
+def calculate_series_current_array(V_h, X_C, X_L, R):
+    # |R + j(X_L - X_C)| without building the complex array
+    Z = np.hypot(R, X_L - X_C)
+    with np.errstate(divide='ignore'):
+        return np.asarray(V_h, dtype=float) / Z
+
+def calculate_shunt_currents_array(V_h, X_C, X_L, R):
+    V_h = np.asarray(V_h, dtype=float)
+    shape = np.broadcast_shapes(V_h.shape, X_C.shape)
+    I_C = np.divide(V_h, X_C, out=np.zeros(shape), where=np.isfinite(X_C))
+    I_L = np.divide(V_h, X_L, out=np.zeros(shape), where=X_L != 0)
+    I_R = np.divide(V_h, R, out=np.zeros(shape), where=R != 0)
+    return I_C, I_L, I_R
+
+def calculate_thd_array(values):
+    values = np.asarray(values, dtype=float)
+    if values.shape[-1] < 2:
+        return np.zeros(values.shape[:-1])
+    fundamental = values[..., 0]
+    numerator = np.sqrt(np.sum(values[..., 1:] ** 2, axis=-1))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(fundamental != 0, numerator / fundamental * 100, 0.0)
+
+PLOT_FORMATS = ('png', 'json')
+_plot_executor = None
+
+def parse_plot_formats(text):
+    text = text.strip().lower()
+    if not text:
+        return PLOT_FORMATS
+    if text == 'none':
+        return ()
+    formats = tuple(f.strip() for f in text.split(',') if f.strip())
+    unknown = set(formats) - {'png', 'json', 'html'}
+    if unknown:
+        raise ValueError(f"Unknown plot format(s): {', '.join(sorted(unknown))}")
+    return formats
+
+def build_figures(df):
+    # Column arrays are read from the table once; each Figure keeps its own copy of its traces
+    harmonics = df['Harmonic'].to_numpy()
+    current_trace = go.Bar(x=harmonics, y=df['Series Current (A)'].to_numpy(), name='Series Current')
+    voltage_trace = go.Bar(x=harmonics, y=df['Voltage (V)'].to_numpy(), name='Voltage')
+
     # Current Spectrum Plot
-    fig_current = go.Figure()
-    fig_current.add_trace(go.Bar(x=df['Harmonic'], y=df['Series Current (A)'], name='Series Current'))
+    fig_current = go.Figure(data=[current_trace])
     fig_current.update_layout(title='Current Spectrum', xaxis_title='Harmonic', yaxis_title='Current (A)')
-    fig_current.write_image('current_spectrum.png')
-    fig_current.write_json('current_spectrum.json')
 
     # Voltage Spectrum Plot
-    fig_voltage = go.Figure()
-    fig_voltage.add_trace(go.Bar(x=df['Harmonic'], y=df['Voltage (V)'], name='Voltage'))
+    fig_voltage = go.Figure(data=[voltage_trace])
     fig_voltage.update_layout(title='Voltage Spectrum', xaxis_title='Harmonic', yaxis_title='Voltage (V)')
-    fig_voltage.write_image('voltage_spectrum.png')
-    fig_voltage.write_json('voltage_spectrum.json')
 
     # Combined Plot
-    fig_combined = go.Figure()
-    fig_combined.add_trace(go.Bar(x=df['Harmonic'], y=df['Voltage (V)'], name='Voltage', yaxis='y'))
-    fig_combined.add_trace(go.Bar(x=df['Harmonic'], y=df['Series Current (A)'], name='Current', yaxis='y2'))
+    fig_combined = go.Figure(data=[voltage_trace, current_trace])
+    fig_combined.update_traces(yaxis='y', selector=dict(name='Voltage'))
+    fig_combined.update_traces(yaxis='y2', name='Current', selector=dict(name='Series Current'))
     fig_combined.update_layout(
         title='Voltage and Current Spectrum',
         xaxis=dict(title='Harmonic'),
@@ -69,31 +130,126 @@ def generate_plots(df, config):
         yaxis2=dict(title='Current (A)', overlaying='y', side='right'),
         barmode='group'
     )
-    fig_combined.write_image('voltage_current_spectrum.png')
-    fig_combined.write_json('voltage_current_spectrum.json')
+    return {
+        'current_spectrum': fig_current,
+        'voltage_spectrum': fig_voltage,
+        'voltage_current_spectrum': fig_combined,
+    }
+
+def write_figures(figures, formats, out_dir='.', cancel_event=None):
+    # JSON/HTML are cheap serialisations; PNG goes through the static image exporter, so do it last
+    # cancel_event is checked between files, an export already started runs to completion
+    for name, fig in figures.items():
+        if cancel_event is not None and cancel_event.is_set():
+            return
+        if 'json' in formats:
+            fig.write_json(os.path.join(out_dir, f'{name}.json'))
+        if 'html' in formats:
+            fig.write_html(os.path.join(out_dir, f'{name}.html'), include_plotlyjs='cdn')
+    if 'png' in formats:
+        for name, fig in figures.items():
+            if cancel_event is not None and cancel_event.is_set():
+                return
+            fig.write_image(os.path.join(out_dir, f'{name}.png'))
+
+def generate_plots(df, config, formats=PLOT_FORMATS, background=False, out_dir='.', cancel_event=None):
+    """
+    Write the spectrum plots in the requested formats ('png', 'json', 'html').
+    With background=True the files are written on a worker thread and a Future is
+    returned; no formats means no plots at all.
+    """
+    global _plot_executor
+    if not formats:
+        return None
+    figures = build_figures(df)
+    if not background:
+        write_figures(figures, formats, out_dir, cancel_event)
+        return None
+    if _plot_executor is None:
+        _plot_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='plots')
+    return _plot_executor.submit(write_figures, figures, formats, out_dir, cancel_event)
 
 # ---------------- Core Calculation ---------------- #
 
+RESULT_COLUMNS = ['Harmonic', 'Voltage (V)', 'Series Current (A)', 'Current C (A)', 'Current L (A)', 'Current R (A)']
+
+def process_data_array(fundamental_freq, C, L, R, harmonics, voltages, config):
+    """
+    Series and shunt currents for every harmonic and every (C, L, R) set in one broadcast.
+    voltages may be a single spectrum or one spectrum per parameter set.
+    Returns a dict of arrays shaped (cases, harmonics) plus per-case THD.
+    """
+    V = np.asarray(voltages, dtype=float)
+    X_C, X_L, R_val = calculate_impedances_array(fundamental_freq, harmonics, C, L, R)
+    series_current = calculate_series_current_array(V, X_C, X_L, R_val)
+    if config == 'shunt':
+        I_C, I_L, I_R = calculate_shunt_currents_array(V, X_C, X_L, R_val)
+    else:
+        I_C = I_L = I_R = series_current
+    return {
+        'X_C': X_C, 'X_L': X_L,
+        'series_current': series_current,
+        'I_C': I_C, 'I_L': I_L, 'I_R': I_R,
+        'voltage_thd': calculate_thd_array(V),
+        'current_thd': calculate_thd_array(series_current),
+    }
+
 def process_data(fundamental_freq, C, L, R, harmonics, voltages, config):
-    data = []
-    series_currents = []
-    for h, V_h in zip(harmonics, voltages):
-        X_C, X_L, R_val = calculate_impedances(fundamental_freq, h, C, L, R)
-        series_current = calculate_series_current(V_h, X_C, X_L, R_val)
-        series_currents.append(series_current)
-        if config == 'shunt':
-            I_C, I_L, I_R = calculate_shunt_currents(V_h, X_C, X_L, R_val)
-        else:
-            I_C, I_L, I_R = series_current, series_current, series_current
-        data.append([h, V_h, series_current, I_C, I_L, I_R])
-
-    df = pd.DataFrame(data, columns=['Harmonic', 'Voltage (V)', 'Series Current (A)', 'Current C (A)', 'Current L (A)', 'Current R (A)'])
-    # Calculate THD
-    voltage_thd = calculate_thd(voltages)
-    current_thd = calculate_thd(series_currents)
-    df.loc[len(df)] = ['THD (%)', voltage_thd, current_thd, '', '', '']
+    """
+    Single-case results as a strictly numeric (float64) spectrum table plus the voltage
+    and current THD. The THD values belong in the summary record, not in the table.
+    """
+    result = process_data_array(fundamental_freq, C, L, R, harmonics, voltages, config)
+    voltage_thd = float(result['voltage_thd'])
+    current_thd = float(result['current_thd'])
+
+    # One float64 block for the whole table, which pandas keeps without copying
+    n = len(harmonics)
+    table = np.empty((n, len(RESULT_COLUMNS)))
+    table[:, 0] = harmonics
+    table[:, 1] = voltages
+    table[:, 2] = result['series_current']
+    table[:, 3] = result['I_C']
+    table[:, 4] = result['I_L']
+    table[:, 5] = result['I_R']
+    df = pd.DataFrame(table, columns=RESULT_COLUMNS, copy=False)
     return df, voltage_thd, current_thd
 
+def make_summary(fundamental_freq, C, L, R, config, voltage_thd, current_thd):
+    return {
+        'Fundamental (Hz)': float(fundamental_freq), 'C (F)': float(C), 'L (H)': float(L), 'R (Ohms)': float(R),
+        'Configuration': config, 'Voltage THD (%)': float(voltage_thd), 'Current THD (%)': float(current_thd),
+    }
+
+RESULT_FORMATS = {'csv': '.csv', 'parquet': '.parquet', 'arrow': '.arrow'}
+
+def write_table(df, path, fmt='csv'):
+    """Write a table as CSV, Parquet or Arrow IPC (Feather v2); the latter two need pyarrow."""
+    if fmt not in RESULT_FORMATS:
+        raise ValueError(f"Unknown results format: {fmt} (choose from {', '.join(RESULT_FORMATS)})")
+    if fmt == 'csv':
+        df.to_csv(path, index=False)
+        return
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        raise ImportError(f"{fmt} output needs pyarrow (pip install pyarrow)") from None
+    if fmt == 'parquet':
+        df.to_parquet(path, index=False)
+    else:
+        df.reset_index(drop=True).to_feather(path)
+
+def write_results(df, summary, stem='harmonic_results', fmt='csv'):
+    """
+    Write the spectrum table to <stem><ext> and the summary record to <stem>_summary<ext>.
+    Returns the two paths.
+    """
+    ext = RESULT_FORMATS[fmt]
+    results_path, summary_path = f'{stem}{ext}', f'{stem}_summary{ext}'
+    write_table(df, results_path, fmt)
+    write_table(pd.DataFrame([summary]), summary_path, fmt)
+    return results_path, summary_path
+
 # ---------------- CLI Mode ---------------- #
 
 def cli_mode():
@@ -103,6 +259,13 @@ def cli_mode():
     L = float(input("Enter inductance (H): "))
     R = float(input("Enter resistance (Ohms): "))
     config = input("Enter configuration (series/shunt): ").strip().lower()
+    plot_formats = parse_plot_formats(input("Plot outputs (png,json,html or none) [png,json]: "))
+    while True:
+        # Checked now, so a typo cannot throw away the finished calculation
+        results_format = input("Results format (csv/parquet/arrow) [csv]: ").strip().lower() or 'csv'
+        if results_format in RESULT_FORMATS:
+            break
+        print(f"Unknown results format '{results_format}', choose from {', '.join(RESULT_FORMATS)}.")
     input_method = input("Enter 'manual' or 'csv' for harmonic spectrum input: ").strip().lower()
 
     harmonics = []
@@ -124,11 +287,18 @@ def cli_mode():
         return
 
     df, v_thd, i_thd = process_data(fundamental_freq, C, L, R, harmonics, voltages, config)
-    df.to_csv('harmonic_results.csv', index=False)
-    generate_plots(df, config)
-    print(f"Results saved to harmonic_results.csv")
+    summary = make_summary(fundamental_freq, C, L, R, config, v_thd, i_thd)
+    results_path, summary_path = write_results(df, summary, fmt=results_format)
+    print(f"Results saved to {results_path} (summary in {summary_path})")
+    # Plots are only started once the tables are safely written, so a failed run leaves none behind
+    plots = generate_plots(df, config, plot_formats, background=True)
+    if plots is not None:
+        print(f"Rendering plots ({', '.join(plot_formats)}) in the background...")
     print(f"Voltage THD: {v_thd:.2f}%")
     print(f"Current THD: {i_thd:.2f}%")
+    if plots is not None:
+        plots.result()
+        print("Plots saved.")
 
 # ---------------- GUI Mode ---------------- #
 
@@ -138,6 +308,70 @@ def gui_mode():
         csv_entry.delete(0, tk.END)
         csv_entry.insert(0, file_path)
 
+    messages = queue.Queue()
+    cancel_event = threading.Event()
+
+    def worker(fundamental_freq, C, L, R, config, csv_path):
+        # Runs off the Tk thread; everything it reports goes through the queue
+        try:
+            messages.put(('progress', "Reading spectrum...", 10))
+            df_csv = pd.read_csv(csv_path)
+            harmonics = df_csv['Harmonic'].tolist()
+            voltages = df_csv['Voltage'].tolist()
+            if cancel_event.is_set():
+                messages.put(('cancelled',))
+                return
+
+            messages.put(('progress', "Calculating...", 30))
+            df, v_thd, i_thd = process_data(fundamental_freq, C, L, R, harmonics, voltages, config)
+            write_results(df, make_summary(fundamental_freq, C, L, R, config, v_thd, i_thd))
+            messages.put(('results', df, v_thd, i_thd))
+            if cancel_event.is_set():
+                messages.put(('cancelled',))
+                return
+
+            messages.put(('progress', "Rendering plots...", 60))
+            generate_plots(df, config, cancel_event=cancel_event)
+            messages.put(('cancelled',) if cancel_event.is_set() else ('done',))
+        except Exception as e:
+            messages.put(('error', str(e)))
+
+    def poll():
+        finished = False
+        while True:
+            try:
+                message = messages.get_nowait()
+            except queue.Empty:
+                break
+            kind = message[0]
+            if kind == 'progress':
+                status_var.set(message[1])
+                progress['value'] = message[2]
+            elif kind == 'results':
+                show_results(*message[1:])
+            elif kind == 'done':
+                status_var.set("Done. Plots saved.")
+                progress['value'] = 100
+                finished = True
+            elif kind == 'cancelled':
+                status_var.set("Cancelled.")
+                finished = True
+            elif kind == 'error':
+                status_var.set("Error.")
+                messagebox.showerror("Error", message[1])
+                finished = True
+        if finished:
+            calc_button.config(state=tk.NORMAL)
+            cancel_button.config(state=tk.DISABLED)
+        else:
+            root.after(50, poll)
+
+    def show_results(df, v_thd, i_thd):
+        results_table.delete(*results_table.get_children())
+        for row in df.itertuples(index=False):
+            results_table.insert('', tk.END, values=[f"{v:.4g}" if isinstance(v, float) else v for v in row])
+        thd_var.set(f"Results saved to harmonic_results.csv and harmonic_results_summary.csv   Voltage THD: {v_thd:.2f}%   Current THD: {i_thd:.2f}%")
+
     def calculate():
         try:
             fundamental_freq = float(freq_entry.get())
@@ -145,23 +379,23 @@ def gui_mode():
             L = float(l_entry.get())
             R = float(r_entry.get())
             config = config_var.get()
-            harmonics = []
-            voltages = []
-            if input_var.get() == 'csv':
-                csv_path = csv_entry.get()
-                df_csv = pd.read_csv(csv_path)
-                harmonics = df_csv['Harmonic'].tolist()
-                voltages = df_csv['Voltage'].tolist()
-            else:
+            if input_var.get() != 'csv':
                 messagebox.showinfo("Info", "Manual input via GUI not implemented. Use CSV option.")
                 return
-
-            df, v_thd, i_thd = process_data(fundamental_freq, C, L, R, harmonics, voltages, config)
-            df.to_csv('harmonic_results.csv', index=False)
-            generate_plots(df, config)
-            messagebox.showinfo("Results", f"Results saved to harmonic_results.csv\nVoltage THD: {v_thd:.2f}%\nCurrent THD: {i_thd:.2f}%")
+            csv_path = csv_entry.get()
         except Exception as e:
             messagebox.showerror("Error", str(e))
+            return
+
+        cancel_event.clear()
+        calc_button.config(state=tk.DISABLED)
+        cancel_button.config(state=tk.NORMAL)
+        threading.Thread(target=worker, args=(fundamental_freq, C, L, R, config, csv_path), daemon=True).start()
+        root.after(50, poll)
+
+    def cancel():
+        cancel_event.set()
+        status_var.set("Cancelling...")
 
     root = tk.Tk()
     root.title("Harmonic Calculator")
@@ -195,7 +429,24 @@ def gui_mode():
     csv_entry.grid(row=6, column=1)
     tk.Button(root, text="Browse", command=browse_csv).grid(row=6, column=2)
 
-    tk.Button(root, text="Calculate", command=calculate).grid(row=7, column=0, columnspan=3)
+    calc_button = tk.Button(root, text="Calculate", command=calculate)
+    calc_button.grid(row=7, column=0, columnspan=2)
+    cancel_button = tk.Button(root, text="Cancel", command=cancel, state=tk.DISABLED)
+    cancel_button.grid(row=7, column=2)
+
+    progress = ttk.Progressbar(root, mode='determinate', maximum=100)
+    progress.grid(row=8, column=0, columnspan=3, sticky='ew')
+    status_var = tk.StringVar(value="Ready.")
+    tk.Label(root, textvariable=status_var).grid(row=9, column=0, columnspan=3)
+
+    column_ids = [f'c{i}' for i in range(len(RESULT_COLUMNS))]
+    results_table = ttk.Treeview(root, columns=column_ids, show='headings', height=10)
+    for column_id, column in zip(column_ids, RESULT_COLUMNS):
+        results_table.heading(column_id, text=column)
+        results_table.column(column_id, width=110, anchor=tk.E)
+    results_table.grid(row=10, column=0, columnspan=3)
+    thd_var = tk.StringVar()
+    tk.Label(root, textvariable=thd_var).grid(row=11, column=0, columnspan=3)
 
     root.mainloop()
 
@@ -205,10 +456,14 @@ if __name__ == "__main__":
     print("Select mode:")
     print("1. CLI")
     print("2. GUI")
-    choice = input("Enter choice (1/2): ").strip()
+    print("3. Frequency Scan")
+    choice = input("Enter choice (1/2/3): ").strip()
     if choice == '1':
         cli_mode()
     elif choice == '2':
         gui_mode()
+    elif choice == '3':
+        from harmonic_scan import scan_cli_mode
+        scan_cli_mode()
     else:
         print("Invalid choice.")
\ No newline at end of file
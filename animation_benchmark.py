@@ -0,0 +1,135 @@
+"""
+Headless, deterministic frame-rendering benchmark for the dancing animations.
+Features:
+- SDL dummy video and audio drivers, so no display or sound device is needed
+- Fixed random seed, frame count and simulated clock (frame / fps) driving the shared
+  fixed-step engine, so every run renders exactly the same frames
+- Optional output of the rendered frames as a PNG sequence or a raw RGB24 stream
+- Per-frame render-time percentiles (update + draw, excluding frame output)
+
+Assets come from the repository through AssetManager; the capybara scene shows its
+placeholder image while capybara.png is missing, unless --capybara-image is given.
+The beat grid comes from the repository soundtrack's sidecar.
+"""
+
+import os
+
+os.environ['SDL_VIDEODRIVER'] = 'dummy'
+os.environ['SDL_AUDIODRIVER'] = 'dummy'
+os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+
+import argparse
+import json
+import random
+import sys
+import time
+
+import numpy as np
+import pygame
+
+from engine import SCENES, Engine, load_scene
+
+PERCENTILES = [50, 90, 95, 99]
+
+# ---------------- Scenes ---------------- #
+
+def make_scene(name, screen, seed, image=None, music=None, lights=None):
+    # Scene defaults apply for any asset not given
+    options = {k: v for k, v in (('image_path', image), ('music_path', music)) if v}
+    if name == 'capybara':
+        options['rng'] = random.Random(seed)
+        if lights is not None:
+            options['lights'] = lights
+    scene_class = getattr(load_scene(name), SCENES[name][1])
+    return scene_class(screen, **options)
+
+# ---------------- Benchmark ---------------- #
+
+def run_benchmark(name, frames=600, fps=60, size=(800, 600), seed=0, warmup=30, png_dir=None, raw_path=None,
+                  image=None, music=None, lights=None):
+    """
+    Render `frames` frames of a scene on the simulated clock and return a dict with the
+    per-frame render times (ms) and their summary. Warm-up frames are rendered but not timed.
+    """
+    random.seed(seed)
+    pygame.init()
+    screen = pygame.display.set_mode(size)
+    scene = make_scene(name, screen, seed, image, music, lights)
+    engine = Engine(scene, fps=fps)
+    raw = open(raw_path, 'wb') if raw_path else None
+    if png_dir:
+        os.makedirs(png_dir, exist_ok=True)
+    times = np.empty(frames)
+    try:
+        for frame in range(-warmup, frames):
+            pygame.event.pump()
+            started = time.perf_counter()
+            scene.draw(engine.advance(max(frame, 0) / fps))
+            elapsed = time.perf_counter() - started
+            if frame < 0:
+                continue
+            times[frame] = elapsed * 1000
+            if png_dir:
+                pygame.image.save(screen, os.path.join(png_dir, f'{name}_{frame:05d}.png'))
+            if raw:
+                raw.write(pygame.image.tobytes(screen, 'RGB'))
+    finally:
+        if raw:
+            raw.close()
+        report = scene.report() if hasattr(scene, 'report') else ''
+        pygame.quit()
+    return {'scene': name, 'frames': frames, 'fps': fps, 'size': list(size), 'seed': seed,
+            'times_ms': times, 'summary': summarise(times, 1000.0 / fps), 'cache': report,
+            'engine': engine.report()}
+
+def summarise(times_ms, budget_ms):
+    summary = {f'p{p}': float(np.percentile(times_ms, p)) for p in PERCENTILES}
+    summary.update({'mean': float(times_ms.mean()), 'max': float(times_ms.max()),
+                    'over_budget': int(np.sum(times_ms > budget_ms)), 'budget': budget_ms})
+    return summary
+
+# ---------------- CLI Mode ---------------- #
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Headless render-time benchmark for the animations.")
+    parser.add_argument('scenes', nargs='*', metavar='SCENE', help=f"Scenes to run: {', '.join(SCENES)} (default: all)")
+    parser.add_argument('--frames', type=int, default=600)
+    parser.add_argument('--warmup', type=int, default=30, help="Untimed frames rendered first")
+    parser.add_argument('--fps', type=float, default=60, help="Simulated frame rate (sets the clock and budget)")
+    parser.add_argument('--size', default='800x600', help="Window size WxH")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--png-dir', help="Write every timed frame as a PNG here")
+    parser.add_argument('--raw', help="Write every timed frame as raw RGB24 to this file (per scene: <scene>_<file>)")
+    parser.add_argument('--capybara-image', help="Image for the capybara scene (default: capybara.png or its placeholder)")
+    parser.add_argument('--lights', type=int, help="Number of disco lights in the capybara scene")
+    parser.add_argument('--json', help="Also write the summaries as JSON")
+    args = parser.parse_args(argv)
+    size = tuple(int(v) for v in args.size.lower().split('x'))
+    unknown = [name for name in args.scenes if name not in SCENES]
+    if unknown:
+        parser.error(f"Unknown scene(s): {', '.join(unknown)}")
+
+    results = []
+    for name in args.scenes or SCENES:
+        raw = None
+        if args.raw:
+            folder, filename = os.path.split(args.raw)
+            raw = os.path.join(folder, f'{name}_{filename}')
+        result = run_benchmark(name, args.frames, args.fps, size, args.seed, args.warmup, args.png_dir, raw,
+                               args.capybara_image if name == 'capybara' else None,
+                               lights=args.lights if name == 'capybara' else None)
+        s = result['summary']
+        print(f"{name}: {args.frames} frames at {size[0]}x{size[1]}, "
+              + ", ".join(f"p{p} {s[f'p{p}']:.2f} ms" for p in PERCENTILES)
+              + f", max {s['max']:.2f} ms, {s['over_budget']} over the {s['budget']:.1f} ms budget")
+        print(f"  {result['engine']}")
+        if result['cache']:
+            print(f"  {result['cache']}")
+        results.append({k: v for k, v in result.items() if k != 'times_ms'})
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+    sys.exit(main())
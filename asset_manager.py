@@ -0,0 +1,117 @@
+"""
+Shared asset manager for the pygame animations.
+Features:
+- Asset names resolved relative to the repository (old absolute paths fall back to the
+  file of the same name in the repository)
+- Images loaded and converted to the display format once, with scaled variants cached
+- LRU eviction of cached surfaces under a memory budget (an evicted image is reloaded on next use;
+  a surface bigger than the whole budget is never cached)
+- Music loading that tries the same track in other formats when one fails to load
+"""
+
+import os
+from collections import OrderedDict
+
+import pygame
+
+ASSET_DIR = os.path.dirname(os.path.abspath(__file__))
+MUSIC_FORMATS = ('.ogg', '.mp3', '.wav')
+
+
+class AssetManager:
+    def __init__(self, root=ASSET_DIR, budget_mb=128):
+        self.root = root
+        self.budget = int(budget_mb * 1024 * 1024)
+        self.surfaces = OrderedDict()
+        self.bytes = 0
+        self.hits = self.misses = self.evictions = 0
+
+    # ---------------- Paths ---------------- #
+
+    def path(self, name):
+        """Absolute path of an asset: as given if it exists, else under the root, else its file name under the root."""
+        # Windows paths are split on backslashes too, so old hard-coded paths still find their file name
+        candidates = [name, os.path.join(self.root, name), os.path.join(self.root, name.replace('\\', '/').split('/')[-1])]
+        for candidate in candidates:
+            if os.path.isfile(candidate):
+                return os.path.abspath(candidate)
+        raise FileNotFoundError(f"Asset not found: {name} (looked in {self.root})")
+
+    # ---------------- Images ---------------- #
+
+    def image(self, name, size=None, alpha=True, fallback=None):
+        """
+        Converted surface for an image, optionally scaled to size (w, h). Both the converted
+        original and each scaled variant are cached. fallback names a stand-in image used when
+        name cannot be found.
+        """
+        try:
+            path = self.path(name)
+        except FileNotFoundError:
+            if fallback is None:
+                raise
+            path = self.path(fallback)
+        key = (path, tuple(size) if size else None, alpha)
+        surface = self.surfaces.get(key)
+        if surface is not None:
+            self.hits += 1
+            self.surfaces.move_to_end(key)
+            return surface
+        self.misses += 1
+        if size:
+            surface = pygame.transform.scale(self.image(path, alpha=alpha), size)
+        else:
+            surface = pygame.image.load(path)
+            if pygame.display.get_surface() is not None:
+                # Match the display's pixel format so blits need no per-pixel conversion
+                surface = surface.convert_alpha() if alpha else surface.convert()
+        self._store(key, surface)
+        return surface
+
+    def preload(self, names, size=None, alpha=True):
+        return [self.image(name, size, alpha) for name in names]
+
+    def _store(self, key, surface):
+        size = surface.get_width() * surface.get_height() * surface.get_bytesize()
+        if size > self.budget:
+            # Larger than the whole budget: returned uncached rather than evicting everything else
+            return
+        while self.surfaces and self.bytes + size > self.budget:
+            _, old = self.surfaces.popitem(last=False)
+            self.bytes -= old.get_width() * old.get_height() * old.get_bytesize()
+            self.evictions += 1
+        self.surfaces[key] = surface
+        self.bytes += size
+
+    # ---------------- Music ---------------- #
+
+    def music_candidates(self, name):
+        stem = os.path.splitext(name.replace('\\', '/').split('/')[-1])[0]
+        candidates = [name] + [stem + ext for ext in MUSIC_FORMATS]
+        paths = []
+        for candidate in candidates:
+            try:
+                path = self.path(candidate)
+            except FileNotFoundError:
+                continue
+            if path not in paths:
+                paths.append(path)
+        return paths
+
+    def load_music(self, name):
+        """Load background music, trying the track in other formats if needed. Returns the loaded path or None."""
+        errors = []
+        for path in self.music_candidates(name):
+            try:
+                pygame.mixer.music.load(path)
+                return path
+            except pygame.error as e:
+                errors.append(f"{os.path.basename(path)}: {e}")
+        print(f"Error loading music {name}: " + ("; ".join(errors) or "file not found"))
+        return None
+
+    def report(self):
+        lookups = self.hits + self.misses
+        hit_rate = self.hits / lookups if lookups else 0.0
+        return (f"assets: {len(self.surfaces)} surfaces, {self.bytes / 1048576:.1f} MB, "
+                f"{hit_rate:.1%} hits, {self.evictions} evictions")
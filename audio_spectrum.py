@@ -0,0 +1,291 @@
+"""
+Real-time audio spectrum analysis driving the animations.
+Features:
+- Ring buffer fed in small blocks from an audio callback; pygame's mixer exposes no sample
+  callback for music, so a playback tap thread replays the decoded track into it in step
+  with the music clock
+- Hann-windowed FFT every hop into preallocated arrays, so the per-block hot path allocates
+  no array memory (needs NumPy >= 2 for rfft's out=; older NumPy falls back to allocating
+  one spectrum per hop)
+- Energies in log-spaced bands, normalised against a slowly decaying peak
+- THD-style distortion metric: the calculate_thd formula of MaxHarmonicCurrent.py, re-done
+  in place on the strongest spectral peak and the bins at its integer multiples, smoothed
+  over time
+- Results handed to the render loop through a double buffer with sequence numbers, so
+  neither side ever waits on a lock
+- Latency (one hop plus the analysis time) measured and reported
+
+Usage: python audio_spectrum.py track.mp3 [--window 1024] [--hop 256] [--bands 8]
+"""
+
+import argparse
+import inspect
+import math
+import sys
+import threading
+import time
+
+import numpy as np
+
+from beat_grid import iter_audio_blocks
+
+try:
+    _RFFT_OUT = 'out' in inspect.signature(np.fft.rfft).parameters
+except (TypeError, ValueError):
+    _RFFT_OUT = False
+
+# ---------------- Decoding ---------------- #
+
+def decode_track(path, rate):
+    """Whole track as mono float32 at `rate` (linearly resampled if decoded at another rate)."""
+    blocks = list(iter_audio_blocks(path, rate=rate))
+    if not blocks:
+        return np.zeros(0, dtype=np.float32)
+    source_rate = blocks[0][0]
+    track = np.concatenate([block for _, block in blocks])
+    if source_rate != rate:
+        positions = np.arange(int(len(track) * rate / source_rate)) * (source_rate / rate)
+        track = np.interp(positions, np.arange(len(track)), track).astype(np.float32)
+    return track
+
+# ---------------- Results ---------------- #
+
+class SpectrumResult:
+    """One analysis result. seq is odd while the writer is filling it in."""
+
+    def __init__(self, bands):
+        self.bands = np.zeros(bands)  # normalised band energies, 0..1
+        self.level = 0.0  # normalised RMS level, 0..1
+        self.thd = 0.0  # smoothed THD-style metric, %
+        self.time = 0.0  # stream time of the newest analysed sample, s
+        self.seq = 0
+
+    def copy_from(self, other):
+        np.copyto(self.bands, other.bands)
+        self.level, self.thd, self.time = other.level, other.thd, other.time
+
+# ---------------- Analyser ---------------- #
+
+class SpectrumAnalyser:
+    def __init__(self, rate, window=1024, hop=256, bands=8, band_range=(40, 16000), max_harmonic=10,
+                 smoothing=0.8, peak_decay=0.995):
+        """
+        push() is the audio-callback side: it copies samples into a ring buffer and analyses
+        the last `window` samples every `hop` samples. read() is the render-loop side.
+        """
+        self.rate = rate
+        self.window_size = window
+        self.hop = hop
+        self.smoothing = smoothing
+        self.peak_decay = peak_decay
+
+        # Double precision throughout: rfft would otherwise allocate a float64 copy of the frame
+        self.ring = np.zeros(window)
+        self.write = 0
+        self.pending = 0
+        self.samples = 0
+        self.window = np.hanning(window)
+        self.frame = np.zeros(window)
+        self.spectrum = np.zeros(window // 2 + 1, dtype=complex)
+        self.magnitude = np.zeros(window // 2 + 1)
+        self.power = np.zeros(window // 2 + 1)
+
+        # Log-spaced band edges as FFT bin indices, at least one bin per band
+        freqs = np.geomspace(band_range[0], min(band_range[1], rate / 2), bands + 1)
+        edges = np.round(freqs * window / rate).astype(int)
+        edges = np.maximum(edges, np.arange(bands + 1) + max(1, edges[0]))
+        self.band_starts = np.minimum(edges[:-1], window // 2)
+        self.band_stop = min(int(edges[-1]), window // 2 + 1)
+        self.energy = np.zeros(bands)
+        self.peak = np.full(bands, 1e-9)
+        self.level_peak = 1e-9
+
+        # Harmonic orders 1..max_harmonic and scratch space for their bins and magnitudes
+        self.lowest_bin = max(1, int(band_range[0] * window / rate))
+        self.orders = np.arange(1, max_harmonic + 1)
+        self.harmonic_bins = np.zeros(max_harmonic, dtype=self.orders.dtype)
+        self.harmonics = np.zeros(max_harmonic)
+        self.thd = 0.0
+
+        # Double buffer: the writer fills slots[1 - front], then flips front
+        self.slots = [SpectrumResult(bands), SpectrumResult(bands)]
+        self.front = 0
+        self.hops = 0
+        self.analysis_time = 0.0
+        self.worst_analysis = 0.0
+
+    # ---------------- Callback Side ---------------- #
+
+    def push(self, samples):
+        """Feed mono float samples (the audio callback's block)."""
+        i, n = 0, len(samples)
+        while i < n:
+            take = min(n - i, self.hop - self.pending, self.window_size - self.write)
+            self.ring[self.write:self.write + take] = samples[i:i + take]
+            self.write = (self.write + take) % self.window_size
+            self.pending += take
+            self.samples += take
+            i += take
+            if self.pending == self.hop:
+                self.pending = 0
+                self._analyse()
+
+    def _analyse(self):
+        started = time.perf_counter()
+        # Unroll the ring into the frame, oldest sample first, applying the window
+        w, split = self.write, self.window_size - self.write
+        np.multiply(self.ring[w:], self.window[:split], out=self.frame[:split])
+        np.multiply(self.ring[:w], self.window[split:], out=self.frame[split:])
+        if _RFFT_OUT:
+            np.fft.rfft(self.frame, out=self.spectrum)
+        else:
+            # NumPy < 2: rfft has no out=, so this allocates a spectrum every hop
+            self.spectrum[:] = np.fft.rfft(self.frame)
+        np.abs(self.spectrum, out=self.magnitude)
+        np.multiply(self.magnitude, self.magnitude, out=self.power)
+
+        # Band energies against a decaying peak, so quiet and loud passages both move the visuals
+        np.add.reduceat(self.power[:self.band_stop], self.band_starts, out=self.energy)
+        np.multiply(self.peak, self.peak_decay, out=self.peak)
+        np.maximum(self.peak, self.energy, out=self.peak)
+        level = math.sqrt(float(np.dot(self.frame, self.frame)) / self.window_size)
+        self.level_peak = max(self.level_peak * self.peak_decay, level)
+
+        # THD-style metric: strongest peak as the fundamental, bins at its multiples as harmonics
+        fundamental = self.lowest_bin + int(np.argmax(self.magnitude[self.lowest_bin:]))
+        count = min(len(self.orders), (len(self.magnitude) - 1) // fundamental)
+        np.multiply(self.orders[:count], fundamental, out=self.harmonic_bins[:count])
+        np.take(self.magnitude, self.harmonic_bins[:count], out=self.harmonics[:count])
+        thd = self._thd(count)
+        self.thd = self.smoothing * self.thd + (1 - self.smoothing) * thd
+
+        self._publish(level)
+        elapsed = time.perf_counter() - started
+        self.hops += 1
+        self.analysis_time += elapsed
+        self.worst_analysis = max(self.worst_analysis, elapsed)
+
+    def _thd(self, count):
+        # Same formula as calculate_thd in MaxHarmonicCurrent.py, which is not called here: it
+        # builds a list every hop, and importing that module pulls in plotly and tkinter
+        if count < 2 or self.harmonics[0] == 0:
+            return 0.0
+        h = self.harmonics[1:count]
+        return math.sqrt(float(np.dot(h, h))) / float(self.harmonics[0]) * 100
+
+    def _publish(self, level):
+        slot = self.slots[1 - self.front]
+        slot.seq += 1
+        np.divide(self.energy, self.peak, out=slot.bands)
+        slot.level = level / self.level_peak
+        slot.thd = self.thd
+        slot.time = self.samples / self.rate
+        slot.seq += 1
+        self.front = 1 - self.front
+
+    # ---------------- Render Side ---------------- #
+
+    def result(self):
+        """A new SpectrumResult for read() to fill."""
+        return SpectrumResult(len(self.energy))
+
+    def read(self, out):
+        """
+        Copy the latest result into out (a SpectrumResult) without waiting. Returns True when
+        out now holds a result newer than before, False if nothing new (or a torn read) came in.
+        """
+        for _ in range(3):
+            slot = self.slots[self.front]
+            seq = slot.seq
+            if seq & 1:
+                continue
+            if seq == out.seq and slot.time == out.time:
+                return False
+            out.copy_from(slot)
+            if slot.seq == seq:
+                out.seq = seq
+                return True
+        return False
+
+    def latency_ms(self):
+        """Worst delay from a sample arriving to its result being readable: one hop plus analysis."""
+        return (self.hop / self.rate + self.worst_analysis) * 1000
+
+    def report(self):
+        mean = self.analysis_time / self.hops * 1000 if self.hops else 0.0
+        return (f"spectrum: {self.hops} hops, {mean:.3f} ms mean / {self.worst_analysis * 1000:.3f} ms worst analysis, "
+                f"latency <= {self.latency_ms():.1f} ms")
+
+# ---------------- Playback Tap ---------------- #
+
+class PlaybackTap(threading.Thread):
+    """
+    Feeds an analyser with the samples of a track as they are played, in hop-sized blocks,
+    following time_source (seconds into the music, e.g. engine.MusicClock).
+    """
+
+    def __init__(self, analyser, path, time_source):
+        super().__init__(daemon=True)
+        self.analyser = analyser
+        self.path = path
+        self.time_source = time_source
+        self.stopped = threading.Event()
+        self.track = None
+
+    def run(self):
+        # Decoded once up front, outside the feeding loop
+        self.track = decode_track(self.path, self.analyser.rate)
+        if not len(self.track):
+            return
+        rate, hop = self.analyser.rate, self.analyser.hop
+        fed = None
+        while not self.stopped.wait(hop / rate):
+            target = int(self.time_source() * rate) % len(self.track)
+            if fed is None or target < fed or target - fed > self.analyser.window_size:
+                # Start, loop or stall: resume one window before the playback position
+                fed = max(0, target - self.analyser.window_size)
+            if target > fed:
+                self.analyser.push(self.track[fed:target])
+                fed = target
+
+    def stop(self):
+        self.stopped.set()
+
+def live_spectrum(path, time_source, **kwargs):
+    """
+    Analyser fed by a started PlaybackTap for a track playing through pygame's mixer,
+    at the mixer's sample rate. None when the mixer is not initialised.
+    """
+    import pygame
+    mixer = pygame.mixer.get_init()
+    if not mixer:
+        return None
+    analyser = SpectrumAnalyser(mixer[0], **kwargs)
+    PlaybackTap(analyser, path, time_source).start()
+    return analyser
+
+# ---------------- CLI Mode ---------------- #
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the real-time spectrum analysis over a track as fast as possible.")
+    parser.add_argument('audio')
+    parser.add_argument('--rate', type=int, default=44100)
+    parser.add_argument('--window', type=int, default=1024)
+    parser.add_argument('--hop', type=int, default=256)
+    parser.add_argument('--bands', type=int, default=8)
+    parser.add_argument('--block', type=int, default=512, help="Samples per simulated callback")
+    args = parser.parse_args(argv)
+
+    rate = args.rate
+    track = decode_track(args.audio, rate)
+    analyser = SpectrumAnalyser(rate, args.window, args.hop, args.bands)
+    result = SpectrumResult(args.bands)
+    for start in range(0, len(track), args.block):
+        analyser.push(track[start:start + args.block])
+        if analyser.read(result) and int(result.time) != int(result.time - args.block / rate):
+            print(f"{result.time:7.2f} s  level {result.level:.2f}  THD {result.thd:6.1f} %  bands "
+                  + " ".join(f"{b:.2f}" for b in result.bands))
+    print(analyser.report())
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,309 @@
+"""
+Offline beat and tempo analysis for the animation soundtracks.
+Features:
+- Streams audio in chunks: WAV through the wave module, anything else through an ffmpeg
+  pipe when ffmpeg is installed, otherwise decoded once by pygame's mixer and fed in chunks
+- Spectral-flux onset envelope from a NumPy FFT of overlapping Hann-windowed frames
+- Tempo from the autocorrelation of the envelope, beats by dynamic-programming tracking
+- Beat grid cached in a JSON sidecar (<audio>.beats.json) keyed by the audio's SHA-256,
+  so animations load it at startup with no audio analysis at runtime
+- BeatClock maps playback time to a fractional beat position for syncing motion
+"""
+
+import argparse
+import bisect
+import hashlib
+import json
+import math
+import os
+import shutil
+import subprocess
+import sys
+import time
+import wave
+
+import numpy as np
+
+GRID_VERSION = 1
+ANALYSIS_RATE = 22050
+
+# ---------------- Audio Decoding ---------------- #
+
+def file_hash(path, chunk=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(chunk), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def _wav_blocks(path, block_frames):
+    with wave.open(path, 'rb') as wav:
+        channels, width, rate = wav.getnchannels(), wav.getsampwidth(), wav.getframerate()
+        if width not in (1, 2, 4):
+            raise ValueError(f"Unsupported WAV sample width: {width} bytes")
+        dtype = {1: np.uint8, 2: np.int16, 4: np.int32}[width]
+        # 8-bit WAV is unsigned around 128, wider samples are signed
+        zero, full_scale = (128.0, 128.0) if width == 1 else (0.0, float(np.iinfo(dtype).max))
+        while True:
+            raw = wav.readframes(block_frames)
+            if not raw:
+                break
+            samples = np.frombuffer(raw, dtype=dtype).reshape(-1, channels).astype(np.float32)
+            yield rate, (samples.mean(axis=1) - zero) / full_scale
+
+def _ffmpeg_blocks(path, block_frames, rate):
+    command = ['ffmpeg', '-v', 'error', '-i', path, '-f', 's16le', '-ac', '1', '-ar', str(rate), '-']
+    with subprocess.Popen(command, stdout=subprocess.PIPE) as process:
+        while True:
+            raw = process.stdout.read(block_frames * 2)
+            if not raw:
+                break
+            yield rate, np.frombuffer(raw[:len(raw) // 2 * 2], dtype=np.int16).astype(np.float32) / 32767
+
+def _pygame_blocks(path, block_frames):
+    # SDL_mixer has no streaming decode API, so the file is decoded once and then chunked
+    os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+    import pygame
+    if not pygame.mixer.get_init():
+        pygame.mixer.init(frequency=ANALYSIS_RATE, size=-16, channels=1)
+    rate, size, _ = pygame.mixer.get_init()
+    samples = pygame.sndarray.array(pygame.mixer.Sound(path))
+    if samples.ndim > 1:
+        samples = samples.mean(axis=1)
+    full_scale = float(2 ** (abs(size) - 1))
+    for start in range(0, len(samples), block_frames):
+        yield rate, samples[start:start + block_frames].astype(np.float32) / full_scale
+
+def iter_audio_blocks(path, block_frames=1 << 16, rate=ANALYSIS_RATE):
+    """Yield (sample_rate, mono float32 block) pairs for an audio file."""
+    if path.lower().endswith('.wav'):
+        return _wav_blocks(path, block_frames)
+    if shutil.which('ffmpeg'):
+        return _ffmpeg_blocks(path, block_frames, rate)
+    return _pygame_blocks(path, block_frames)
+
+# ---------------- Onsets and Tempo ---------------- #
+
+def onset_envelope(blocks, frame=2048, hop=512):
+    """
+    Spectral flux (sum of positive log-magnitude increases between frames) for a block stream.
+    Returns (envelope, frame_rate, sample_rate, duration). Samples that do not fill a frame are
+    carried into the next block, so block boundaries do not affect the result.
+    """
+    window = np.hanning(frame).astype(np.float32)
+    carry = np.zeros(0, dtype=np.float32)
+    previous = None
+    flux = []
+    sample_rate, total = None, 0
+    for sample_rate, block in blocks:
+        total += len(block)
+        buffer = np.concatenate([carry, block])
+        n_frames = (len(buffer) - frame) // hop + 1 if len(buffer) >= frame else 0
+        if n_frames <= 0:
+            carry = buffer
+            continue
+        frames = np.lib.stride_tricks.sliding_window_view(buffer, frame)[::hop][:n_frames]
+        spectrum = np.log1p(100 * np.abs(np.fft.rfft(frames * window, axis=1)))
+        if previous is None:
+            previous = spectrum[:1]
+        diff = np.diff(np.concatenate([previous, spectrum]), axis=0)
+        flux.append(np.maximum(diff, 0).sum(axis=1))
+        previous = spectrum[-1:]
+        carry = buffer[n_frames * hop:]
+    if sample_rate is None:
+        raise ValueError("No audio decoded")
+    envelope = np.concatenate(flux) if flux else np.zeros(0)
+    return envelope, sample_rate / hop, sample_rate, total / sample_rate
+
+def pick_onsets(envelope, frame_rate, wait=0.05, delta=0.1):
+    """Onset times (s): local maxima above a moving-average threshold, at least `wait` s apart."""
+    if not len(envelope):
+        return np.zeros(0)
+    norm = (envelope - envelope.mean()) / (envelope.std() or 1.0)
+    width = max(1, int(0.1 * frame_rate))
+    local_mean = np.convolve(norm, np.ones(2 * width + 1) / (2 * width + 1), mode='same')
+    peaks = (norm[1:-1] > norm[:-2]) & (norm[1:-1] >= norm[2:]) & (norm[1:-1] > local_mean[1:-1] + delta)
+    candidates = np.nonzero(peaks)[0] + 1
+    onsets, last = [], -np.inf
+    for i in candidates:
+        if i - last >= wait * frame_rate:
+            onsets.append(i)
+            last = i
+    return np.array(onsets) / frame_rate
+
+def estimate_tempo(envelope, frame_rate, bpm_range=(60, 200), prior_bpm=120, prior_width=1.0):
+    """
+    Tempo (BPM) from the FFT autocorrelation of the envelope, weighted by a log-normal prior
+    around prior_bpm (prior_width in octaves) to settle octave ambiguity.
+    """
+    x = envelope - envelope.mean()
+    n = 1 << int(np.ceil(np.log2(2 * len(x))))
+    spectrum = np.fft.rfft(x, n)
+    autocorr = np.fft.irfft(spectrum * np.conj(spectrum), n)[:len(x)]
+    lags = np.arange(len(autocorr))
+    lo = int(np.floor(60 * frame_rate / bpm_range[1]))
+    hi = min(int(np.ceil(60 * frame_rate / bpm_range[0])), len(autocorr) - 2)
+    if hi <= lo:
+        return float(prior_bpm)
+    bpm = 60 * frame_rate / np.maximum(lags[lo:hi + 1], 1)
+    weight = np.exp(-0.5 * (np.log2(bpm / prior_bpm) / prior_width) ** 2)
+    k = lo + int(np.argmax(autocorr[lo:hi + 1] * weight))
+    # Parabolic interpolation of the peak lag
+    a, b, c = autocorr[k - 1], autocorr[k], autocorr[k + 1]
+    denom = a - 2 * b + c
+    lag = k + (0.5 * (a - c) / denom if denom else 0.0)
+    return float(60 * frame_rate / lag)
+
+def track_beats(envelope, frame_rate, bpm, tightness=100.0):
+    """
+    Beat times (s) by dynamic programming: each frame's score is its onset strength plus the
+    best earlier score, penalised by how far that gap is from one beat period.
+    """
+    if not len(envelope):
+        return np.zeros(0)
+    period = 60 * frame_rate / bpm
+    strength = envelope / (envelope.std() or 1.0)
+    offsets = np.arange(-int(round(2 * period)), -int(round(period / 2)) + 1)
+    penalty = -tightness * np.log(-offsets / period) ** 2
+    score = strength.copy()
+    backlink = np.full(len(strength), -1)
+    for i in range(-offsets[-1], len(strength)):
+        prev = i + offsets
+        valid = prev >= 0
+        candidates = np.where(valid, score[np.clip(prev, 0, None)] + penalty, -np.inf)
+        best = int(np.argmax(candidates))
+        if candidates[best] > 0:
+            score[i] += candidates[best]
+            backlink[i] = prev[best]
+    # Start from the best-scoring frame in the last beat period and follow the links back
+    tail = max(0, len(score) - int(round(period)))
+    i = tail + int(np.argmax(score[tail:]))
+    beats = []
+    while i >= 0:
+        beats.append(i)
+        i = backlink[i]
+    return np.array(beats[::-1]) / frame_rate
+
+def analyse_audio(path, frame=2048, hop=512):
+    """Full analysis of one audio file as a JSON-ready beat grid dict."""
+    started = time.perf_counter()
+    envelope, frame_rate, sample_rate, duration = onset_envelope(iter_audio_blocks(path), frame, hop)
+    bpm = estimate_tempo(envelope, frame_rate)
+    # Envelope frames are timed from their start; report times at the frame centre
+    centre = frame / 2 / sample_rate
+    beats = track_beats(envelope, frame_rate, bpm) + centre
+    onsets = pick_onsets(envelope, frame_rate) + centre
+    return {
+        'version': GRID_VERSION,
+        'audio_sha256': file_hash(path),
+        'audio_file': os.path.basename(path),
+        'sample_rate': sample_rate,
+        'hop': hop,
+        'duration': duration,
+        'tempo_bpm': bpm,
+        'beats': [round(float(t), 4) for t in beats],
+        'onsets': [round(float(t), 4) for t in onsets],
+        'analysis_seconds': time.perf_counter() - started,
+    }
+
+# ---------------- Sidecar Cache ---------------- #
+
+def sidecar_path(path):
+    return path + '.beats.json'
+
+def load_beat_grid(path, analyse=True, force=False):
+    """
+    Beat grid for an audio file from its sidecar, if the sidecar matches the audio's hash.
+    Otherwise the audio is analysed and the sidecar rewritten (or None returned when analyse is False).
+    """
+    sidecar = sidecar_path(path)
+    digest = file_hash(path)
+    if not force and os.path.exists(sidecar):
+        with open(sidecar) as f:
+            grid = json.load(f)
+        if grid.get('audio_sha256') == digest and grid.get('version') == GRID_VERSION:
+            return grid
+    if not analyse:
+        return None
+    grid = analyse_audio(path)
+    with open(sidecar, 'w') as f:
+        json.dump(grid, f, indent=1)
+    return grid
+
+class BeatClock:
+    """
+    Fractional beat position for a playback time, from a beat grid or a fixed tempo.
+    The position keeps counting through looped playback, whether the playback time runs
+    on past the track's end or starts again from 0 at each loop.
+    """
+
+    # A playback time this far behind the previous one is a loop, not jitter in the music clock
+    WRAP_SECONDS = 1.0
+
+    def __init__(self, grid=None, bpm=115.0):
+        self.beats = list(grid['beats']) if grid and len(grid['beats']) >= 2 else []
+        self.duration = grid['duration'] if grid else None
+        self.interval = 60.0 / (grid['tempo_bpm'] if grid else bpm)
+        self.offset = 0.0  # beats counted in loops whose playback time has since wrapped to 0
+        self.last_t = None
+
+    @classmethod
+    def for_audio(cls, path, bpm=115.0):
+        # Sidecar only: no audio analysis at runtime, fixed tempo if there is no up-to-date grid
+        try:
+            grid = load_beat_grid(path, analyse=False)
+        except Exception as e:
+            print(f"Beat grid unavailable ({e}); using {bpm:g} BPM")
+            return cls(None, bpm)
+        if grid is None:
+            print(f"No up-to-date beat grid for {path} (run beat_grid.py on it); using {bpm:g} BPM")
+        return cls(grid, bpm)
+
+    def _track_position(self, t):
+        # Position within the playback time t alone, with t folded modulo the track duration
+        if not self.beats:
+            return t / self.interval
+        loops = 0
+        if self.duration:
+            loops, t = divmod(t, self.duration)
+        beats = self.beats
+        i = bisect.bisect_right(beats, t) - 1
+        if i < 0:
+            local = (t - beats[0]) / self.interval
+        elif i >= len(beats) - 1:
+            local = len(beats) - 1 + (t - beats[-1]) / self.interval
+        else:
+            local = i + (t - beats[i]) / (beats[i + 1] - beats[i])
+        return loops * len(beats) + local
+
+    def position(self, t):
+        if self.last_t is not None and t < self.last_t - self.WRAP_SECONDS:
+            # Playback wrapped to the start: carry on from the loops played so far
+            if self.beats and self.duration:
+                self.offset += (self.last_t // self.duration + 1) * len(self.beats)
+            else:
+                # Track length unknown: resume on the next whole beat
+                self.offset += math.ceil(self._track_position(self.last_t))
+        self.last_t = t
+        return self.offset + self._track_position(t)
+
+    def beat_and_phase(self, t):
+        position = self.position(t)
+        beat = math.floor(position)
+        return beat, position - beat
+
+# ---------------- CLI Mode ---------------- #
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Analyse a soundtrack's beats and cache the beat grid beside it.")
+    parser.add_argument('audio', nargs='+')
+    parser.add_argument('--force', action='store_true', help="Re-analyse even if the sidecar is current")
+    args = parser.parse_args(argv)
+    for path in args.audio:
+        started = time.perf_counter()
+        grid = load_beat_grid(path, force=args.force)
+        print(f"{path}: {grid['tempo_bpm']:.1f} BPM, {len(grid['beats'])} beats, {len(grid['onsets'])} onsets "
+              f"over {grid['duration']:.1f} s ({time.perf_counter() - started:.2f} s) -> {sidecar_path(path)}")
+
+if __name__ == "__main__":
+    sys.exit(main())
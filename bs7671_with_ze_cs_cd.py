@@ -1,8 +1,10 @@
 import streamlit as st
 import pandas as pd
+import numpy as np
 import math
 from io import BytesIO
 import matplotlib.pyplot as plt
+from harmonic_derating import third_harmonic_content, thd_to_third_harmonic, harmonic_reduction, select_sizes
 
 # Actual BS 7671 cable tables for sizes up to 1000 mm²
 cable_table = {
@@ -106,6 +108,20 @@ else:
 fault_current = st.number_input("Fault Current (A)", min_value=0.0, value=500.0)
 Ze = st.number_input("External Earth Impedance (Ze) Ω", min_value=0.0, value=0.35)
 
+# Harmonic content of the load current (only derates three-phase multicore, i.e. four/five-core, cables)
+harmonic_input = st.selectbox("Harmonic Input", ["Third Harmonic (%)", "Current THD (%)", "Spectrum CSV"])
+if harmonic_input == "Spectrum CSV":
+    spectrum_file = st.file_uploader("Harmonic Current Spectrum (columns: Harmonic, Current)", type=["csv"])
+    if spectrum_file is not None:
+        df_spectrum = pd.read_csv(spectrum_file)
+        third_content = float(third_harmonic_content(df_spectrum['Harmonic'], df_spectrum['Current'])[0])
+    else:
+        third_content = 0.0
+elif harmonic_input == "Current THD (%)":
+    third_content = float(thd_to_third_harmonic(st.number_input("Current THD (%)", min_value=0.0, value=0.0)))
+else:
+    third_content = st.number_input("Third Harmonic Content (%)", min_value=0.0, value=0.0)
+
 # Cable size dropdown with Auto option
 sizes = sorted(cable_table[cable_key][method].keys())
 user_size = st.selectbox("Cable Size (mm²)", ["Auto"] + [str(s) for s in sizes])
@@ -117,9 +133,14 @@ if st.button("Calculate"):
     # Auto-select protective device rating
     rating = next((r for r in standard_ratings if r >= Ib), max(standard_ratings))
 
+    # Harmonic reduction factor (Ch) and neutral current for four/five-core cables
+    four_core = phase == 'Three' and construction == 'Multicore'
+    sizing_current, Ch, neutral_based, I_N = harmonic_reduction(Ib, third_content, four_core, rating)
+    sizing_current, Ch, neutral_based, I_N = float(sizing_current), float(Ch), bool(neutral_based), float(I_N)
+
     # Required Iz
-    correction = Ca * Cg * Ci * Cs * Cd
-    required_Iz = rating / correction
+    correction = Ca * Cg * Ci * Cs * Cd * Ch
+    required_Iz = sizing_current / correction
 
     # Initialize variables
     selected_size = None
@@ -204,7 +225,8 @@ if st.button("Calculate"):
     st.write(f"**Design Current (Ib):** {Ib:.2f} A")
     st.write(f"**Auto-selected Protective Device Rating (It):** {rating} A")
     st.write(f"**Required Iz:** {required_Iz:.2f} A")
-    st.write(f"**Ca (Ambient Temp):** {Ca}, **Cg (Grouping):** {Cg}, **Ci (Insulation):** {Ci}, **Cs (Soil):** {Cs}, **Cd (Depth):** {Cd}")
+    st.write(f"**Ca (Ambient Temp):** {Ca}, **Cg (Grouping):** {Cg}, **Ci (Insulation):** {Ci}, **Cs (Soil):** {Cs}, **Cd (Depth):** {Cd}, **Ch (Harmonics):** {Ch}")
+    st.write(f"**Third Harmonic Content:** {third_content:.1f}%, **Neutral Current:** {I_N:.2f} A ({'neutral' if neutral_based else 'phase'} current basis)")
     st.write(f"**Combined Correction Factor:** {correction:.2f}")
     st.write(f"**External Earth Impedance (Ze):** {Ze} Ω")
     st.write(f"**Selected Cable Size:** {selected_size} mm² (Capacity: {capacity} A)")
@@ -257,6 +279,7 @@ if st.button("Calculate"):
         'Phase': phase, 'Cable Type': cable_type, 'Install Method': method,
         'Device Type': device_type, 'Device Rating (A)': rating,
         'Fault Current (A)': fault_current, 'External Earth Impedance (Ze)': Ze, 'Cs (Soil)': Cs, 'Cd (Depth)': Cd,
+        'Third Harmonic (%)': third_content, 'Ch (Harmonics)': Ch, 'Neutral Current (A)': I_N,
         'Design Current (Ib)': Ib, 'Required Iz': required_Iz,
         'Cable Size': selected_size, 'Capacity': capacity,
         'Earth Size': earth_size,
@@ -279,3 +302,167 @@ if st.button("Calculate"):
         file_name="bs7671_results.xlsx",
         mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
     )
+
+# Board schedule: size every circuit in one vectorised pass
+st.header("Board Schedule")
+st.caption("Columns: Power_kW, Voltage_V, Power_Factor, Length_m, Ambient_Temp, Num_Circuits and optionally "
+           "Phase, Third_Harmonic_% or THD_%, or a current spectrum as I_h1, I_h3, I_h5, ... "
+           "Cable type, construction, method, device type, Ci, Cs, Cd, Ze and fault current are taken from "
+           "the inputs above.")
+board_file = st.file_uploader("Board Schedule (CSV/Excel)", type=["csv", "xlsx"])
+
+def board_factor(values, table):
+    """
+    Correction factor for each board value from a Ca/Cg table, taking the next table entry up,
+    which is the conservative one, for values between entries (e.g. 33 °C is sized at 35 °C).
+    Returns (factor, key used); both are NaN for a missing value or one beyond the table.
+    """
+    keys = np.array(sorted(table), dtype=float)
+    factors = np.array([table[k] for k in sorted(table)], dtype=float)
+    values = np.asarray(values, dtype=float)
+    index = np.searchsorted(keys, values, side='left')
+    valid = ~np.isnan(values) & (index < len(keys))
+    index = np.minimum(index, len(keys) - 1)
+    return np.where(valid, factors[index], np.nan), np.where(valid, keys[index], np.nan)
+
+def first_size(ok, sizes):
+    # Smallest size whose column of ok is True for each circuit, NaN where none is
+    return np.where(ok.any(axis=1), sizes[np.argmax(ok, axis=1)], np.nan)
+
+def size_board(board):
+    """
+    Size every circuit of a board schedule with the same checks as the single-circuit tool:
+    capacity, voltage drop, Zs, line and earth short-circuit withstand and disconnection time.
+    Rows whose ambient temperature or grouping is missing or beyond the Ca/Cg tables get no
+    size and an error note; a temperature or circuit count between table entries is sized at
+    the next entry up, with a note.
+    """
+    P = board['Power_kW'].to_numpy(float)
+    V = board['Voltage_V'].to_numpy(float)
+    PF = board['Power_Factor'].to_numpy(float)
+    L = board['Length_m'].to_numpy(float)
+    if 'Phase' in board:
+        three = (board['Phase'].astype(str).str.capitalize() == 'Three').to_numpy()
+    else:
+        three = V >= 400
+    Ib = P * 1000 / np.where(three, math.sqrt(3) * V * PF, V * PF)
+
+    ratings = np.array(standard_ratings)
+    rating = ratings[np.minimum(np.searchsorted(ratings, Ib), len(ratings) - 1)]
+
+    ca_table = ca_table_pvc if cable_type == "PVC" else ca_table_xlpe
+    ambient = pd.to_numeric(board['Ambient_Temp'], errors='coerce').to_numpy(float)
+    grouped = pd.to_numeric(board['Num_Circuits'], errors='coerce').to_numpy(float)
+    Ca_b, ambient_used = board_factor(ambient, ca_table)
+    Cg_b, grouped_used = board_factor(np.where(grouped >= 1, grouped, np.nan), cg_table)
+
+    notes = [[] for _ in range(len(board))]
+    for i in range(len(board)):
+        if np.isnan(ambient[i]):
+            notes[i].append("Error: no ambient temperature")
+        elif np.isnan(Ca_b[i]):
+            notes[i].append(f"Error: {ambient[i]:g} °C is above the Ca table (max {max(ca_table)} °C)")
+        elif ambient_used[i] != ambient[i]:
+            notes[i].append(f"Ca taken at {ambient_used[i]:g} °C for {ambient[i]:g} °C")
+        if np.isnan(grouped[i]) or grouped[i] < 1:
+            notes[i].append("Error: no number of grouped circuits")
+        elif np.isnan(Cg_b[i]):
+            notes[i].append(f"Error: {grouped[i]:g} grouped circuits is beyond the Cg table (max {max(cg_table)})")
+        elif grouped_used[i] != grouped[i]:
+            notes[i].append(f"Cg taken for {grouped_used[i]:g} circuits for {grouped[i]:g}")
+        if Ib[i] > rating[i]:
+            notes[i].append(f"Ib exceeds the largest device rating ({rating[i]} A)")
+
+    spectrum_cols = [c for c in board.columns if str(c).startswith('I_h')]
+    if spectrum_cols:
+        orders = [int(str(c)[3:]) for c in spectrum_cols]
+        h3 = third_harmonic_content(orders, board[spectrum_cols].fillna(0).to_numpy(float))
+    elif 'Third_Harmonic_%' in board:
+        h3 = board['Third_Harmonic_%'].fillna(0).to_numpy(float)
+    elif 'THD_%' in board:
+        h3 = thd_to_third_harmonic(board['THD_%'].fillna(0).to_numpy(float))
+    else:
+        h3 = np.zeros(len(board))
+
+    basis, Ch_b, neutral_b, I_N_b = harmonic_reduction(Ib, h3, three & (construction == 'Multicore'), rating)
+    req_Iz = basis / (Ca_b * Cg_b * Ci * Cs * Cd * Ch_b)
+
+    table = cable_table[cable_key][method]
+    size_iz = select_sizes(req_Iz, list(table.keys()), list(table.values()))
+
+    # Every other check only gets easier with a larger size, so each gives a smallest passing
+    # size and the circuit takes the largest of them
+    sizes = np.array(sorted(table), dtype=float)
+    earth = np.array([earth_conductor_size(s) for s in sizes])
+
+    # Voltage drop: smallest size whose mV/A/m keeps the drop within 5%
+    vd_mV = np.where(three[:, None],
+                     [voltage_drop_table_three[s] for s in sizes],
+                     [voltage_drop_table_single[s] for s in sizes])
+    vd_factor = np.where(three, math.sqrt(3), 1.0) * Ib * L / 1000
+    size_vd = first_size(vd_mV * vd_factor[:, None] <= (V * 0.05)[:, None], sizes)
+
+    # Earth fault loop impedance with the line and earth conductors of each size
+    Zs_all = Ze + 0.018 * L[:, None] * (1 / sizes + 1 / earth)
+    size_zs = first_size(Zs_all <= max_zs_table[device_type], sizes)
+
+    # Short-circuit withstand of the line and earth conductors
+    sc_required_size = math.sqrt(fault_current**2 * 0.4) / 115
+    sc_ok = (sizes >= sc_required_size) & (earth >= sc_required_size)
+    size_sc = sizes[np.argmax(sc_ok)] if sc_ok.any() else np.nan
+
+    # Disconnection time depends on the device alone, so no cable size can fix it
+    actual_time = np.array([disconnection_time(device_type, fault_current, r) for r in rating])
+    time_ok = actual_time <= np.array([required_disconnection_time(r) for r in rating])
+
+    # NaN (no passing size, or a Ca/Cg error) carries through to the circuit's size
+    size = np.maximum(np.maximum(size_iz, size_vd), np.maximum(size_zs, size_sc))
+    for i in range(len(board)):
+        if np.isnan(Ca_b[i] * Cg_b[i]):
+            continue
+        failed = [name for name, check_size in (("Iz Compliance", size_iz[i]), ("Voltage Drop", size_vd[i]),
+                                                ("Zs", size_zs[i]), ("Short-Circuit", size_sc))
+                  if np.isnan(check_size)]
+        if failed:
+            notes[i].append("No size passes: " + ", ".join(failed))
+        if not time_ok[i]:
+            notes[i].append("Disconnection Time fails")
+
+    earth_size = np.array([earth_conductor_size(s) if not np.isnan(s) else np.nan for s in size])
+    with np.errstate(divide='ignore', invalid='ignore'):
+        Zs = Ze + 0.018 * L * (1 / size + 1 / earth_size)
+
+    out = board.copy()
+    out['Phase'] = np.where(three, 'Three', 'Single')
+    out['Design Current (Ib)'] = Ib
+    out['Device Rating (A)'] = rating
+    out['Ca (Ambient Temp)'] = Ca_b
+    out['Cg (Grouping)'] = Cg_b
+    out['Third Harmonic (%)'] = h3
+    out['Neutral Current (A)'] = I_N_b
+    out['Ch (Harmonics)'] = Ch_b
+    out['Sizing Basis'] = np.where(neutral_b, 'Neutral', 'Phase')
+    out['Required Iz'] = req_Iz
+    out['Cable Size (mm²)'] = size
+    out['Earth Size (mm²)'] = earth_size
+    out['Zs (Ω)'] = Zs
+    out['Disconnection Time (s)'] = actual_time
+    out['Time OK'] = time_ok
+    out['All Checks OK'] = ~np.isnan(size) & time_ok & (Ib <= rating)
+    out['Notes'] = ["; ".join(n) for n in notes]
+    return out
+
+if board_file is not None and st.button("Size Board"):
+    board = pd.read_csv(board_file) if board_file.name.endswith('.csv') else pd.read_excel(board_file)
+    sized = size_board(board)
+    st.dataframe(sized)
+
+    output = BytesIO()
+    with pd.ExcelWriter(output, engine='openpyxl') as writer:
+        sized.to_excel(writer, index=False)
+    st.download_button(
+        label="Download Board Schedule as Excel",
+        data=output.getvalue(),
+        file_name="bs7671_board_results.xlsx",
+        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+    )
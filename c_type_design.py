@@ -0,0 +1,184 @@
+"""
+C-type filter design-space explorer.
+Features:
+- Sweeps tuning order, quality factor, reactive power rating and C2/C1 split
+- Maps each design point to L, C1, C2 and R for the topology in Harmonic.py
+- Evaluates harmonic attenuation, fundamental loss in R and component stresses
+  with the broadcast c_type_filter_arrays kernel, chunked across a process pool
+- Returns the Pareto-optimal designs
+"""
+
+import argparse
+import bisect
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from Harmonic import c_type_filter_arrays, QUANTITIES
+
+# Pareto objectives (all minimised) followed by the other reported metrics
+OBJECTIVES = ['Harmonic Current to System (%)', 'Fundamental Loss (W)', 'C1 Peak Voltage (V)']
+METRICS = OBJECTIVES + ['C2 Peak Voltage (V)', 'L RMS Current (A)', 'R RMS Current (A)', 'Fundamental Q (var)']
+DESIGN_COLUMNS = ['Tuning Order', 'Quality Factor', 'Rating (var)', 'C2/C1', 'L (H)', 'C1 (F)', 'C2 (F)', 'R (Ohms)']
+
+# ---------------- Design Equations ---------------- #
+
+def design_components(tuning_order, quality_factor, rating, c2_ratio, voltage, f_base=50):
+    """
+    L, C1, C2 and R for the Harmonic.py topology (L in series with C1 || (R + C2)).
+
+    C1 + C2 is chosen so the filter would deliver exactly `rating` var at the fundamental with
+    L in series and no R, L tunes that capacitance to `tuning_order`, and R is quality_factor
+    times the characteristic reactance sqrt(L / (C1 + C2)). R in the C2 branch lowers the
+    delivered Q, most at low tuning orders and high quality factors (with C2/C1 = 1: about 2%
+    at n = 4.7, q = 2, but 30% at n = 2.5, q = 5), so evaluate_designs reports the exact
+    fundamental Q of every design.
+    """
+    omega_1 = 2 * np.pi * f_base
+    # Net fundamental reactance X_C * (1 - 1/n^2) must equal V^2 / rating
+    X_C = voltage ** 2 / (rating * (1 - 1 / tuning_order ** 2))
+    C_total = 1 / (omega_1 * X_C)
+    L = 1 / ((tuning_order * omega_1) ** 2 * C_total)
+    C1 = C_total / (1 + c2_ratio)
+    C2 = C_total - C1
+    R = quality_factor * np.sqrt(L / C_total)
+    return L, C1, C2, R
+
+def design_grid(tuning_orders, quality_factors, ratings, c2_ratios=(0.5,)):
+    grids = np.meshgrid(tuning_orders, quality_factors, ratings, c2_ratios, indexing='ij')
+    return np.column_stack([g.ravel() for g in grids])
+
+# ---------------- Evaluation ---------------- #
+
+def evaluate_designs(designs, harmonics, V_harmonics, voltage, s_sc, f_base=50):
+    """
+    Metrics for an array of design points (rows of tuning order, q, rating, C2/C1).
+
+    Attenuation is the mean share of a harmonic current injected at the bus that flows
+    into the supply (inductive, short-circuit power s_sc) rather than the filter.
+    Stresses use the applied voltage spectrum: peaks are the arithmetic sum of harmonic
+    peaks, currents are true RMS over all harmonics.
+    """
+    L, C1, C2, R = design_components(*designs.T, voltage, f_base)
+    result = c_type_filter_arrays(harmonics, V_harmonics, L, C1, C2, R, f_base)
+    mag, ang = result['magnitude'], result['angle']
+    q = {name: i for i, name in enumerate(QUANTITIES)}
+    h = np.asarray(harmonics, dtype=float)
+    V = np.asarray(V_harmonics, dtype=float)
+    fundamental = h == 1
+
+    # Filter impedance per harmonic from the source current, supply impedance j*h*X_s
+    I_s = mag[q['I_source']] * np.exp(1j * np.radians(ang[q['I_source']]))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        Z_f = V / I_s
+    Z_s = 1j * h * voltage ** 2 / s_sc
+    share = np.abs(Z_f / (Z_f + Z_s))
+    harmonic_share = share[:, ~fundamental].mean(axis=1) * 100
+
+    loss = (mag[q['V_R']][:, fundamental] ** 2).sum(axis=1) / R
+    peak = lambda name: np.sqrt(2) * mag[q[name]].sum(axis=1)
+    rms = lambda name: np.sqrt((mag[q[name]] ** 2).sum(axis=1))
+    I_1 = mag[q['I_source']][:, fundamental].sum(axis=1)
+    phi_1 = np.radians(ang[q['I_source']][:, fundamental].sum(axis=1))
+    Q_1 = V[fundamental].sum() * I_1 * np.sin(phi_1)
+
+    metrics = np.column_stack([harmonic_share, loss, peak('V_C1'), peak('V_C2'),
+                               rms('I_source'), rms('I_branch'), Q_1])
+    return np.column_stack([designs, L, C1, C2, R]), metrics
+
+def pareto_mask(points):
+    """
+    Boolean mask of rows of a three-column points array (all minimised) that no other
+    row dominates; identical rows are kept once.
+
+    Rows are swept in order of the first objective while a staircase of the best
+    (second, third) pairs seen so far answers "is anything earlier at least as good on
+    both?" by bisection, which keeps the sweep O(n log n) even for very large fronts.
+    """
+    order = np.lexsort((points[:, 2], points[:, 1], points[:, 0]))
+    ys, zs = [], []  # staircase: ys strictly increasing, zs strictly decreasing
+    mask = np.zeros(len(points), dtype=bool)
+    for i, y, z in zip(order.tolist(), points[order, 1].tolist(), points[order, 2].tolist()):
+        k = bisect.bisect_right(ys, y)
+        if k and zs[k - 1] <= z:
+            continue
+        mask[i] = True
+        # Remove staircase steps the new point covers, then insert it
+        start = k - 1 if k and ys[k - 1] == y else k
+        stop = k
+        while stop < len(ys) and zs[stop] >= z:
+            stop += 1
+        ys[start:stop] = [y]
+        zs[start:stop] = [z]
+    return mask
+
+def _evaluate_chunk(args):
+    # Worker: evaluate one chunk and send back only its non-dominated designs
+    designs, harmonics, V_harmonics, voltage, s_sc, f_base = args
+    components, metrics = evaluate_designs(designs, harmonics, V_harmonics, voltage, s_sc, f_base)
+    valid = np.all(np.isfinite(metrics), axis=1)
+    components, metrics = components[valid], metrics[valid]
+    mask = pareto_mask(metrics[:, :len(OBJECTIVES)])
+    return components[mask], metrics[mask]
+
+def explore_designs(designs, harmonics, V_harmonics, voltage=230, s_sc=5e6, f_base=50, workers=None, chunk=20000):
+    """
+    Evaluate every design point in parallel and return the Pareto-optimal ones as a DataFrame.
+    Each chunk is reduced to its own front first, so only a small set is merged at the end.
+    """
+    tasks = [(designs[i:i + chunk], harmonics, V_harmonics, voltage, s_sc, f_base)
+             for i in range(0, len(designs), chunk)]
+    if workers == 1 or len(tasks) == 1:
+        parts = [_evaluate_chunk(t) for t in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            parts = list(pool.map(_evaluate_chunk, tasks))
+    components = np.concatenate([p[0] for p in parts])
+    metrics = np.concatenate([p[1] for p in parts])
+    mask = pareto_mask(metrics[:, :len(OBJECTIVES)])
+    front = pd.DataFrame(np.column_stack([components[mask], metrics[mask]]), columns=DESIGN_COLUMNS + METRICS)
+    return front.sort_values(OBJECTIVES[0], ignore_index=True)
+
+# ---------------- CLI Mode ---------------- #
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Explore C-type filter designs and report the Pareto front.")
+    parser.add_argument('--orders', nargs=3, type=float, default=[2.5, 4.8, 100], metavar=('MIN', 'MAX', 'N'),
+                        help="Tuning order sweep")
+    parser.add_argument('--q', nargs=3, type=float, default=[0.5, 10, 100], metavar=('MIN', 'MAX', 'N'),
+                        help="Quality factor sweep (log spaced)")
+    parser.add_argument('--rating', nargs=3, type=float, default=[5e3, 100e3, 100], metavar=('MIN', 'MAX', 'N'),
+                        help="Fundamental reactive power sweep (var, log spaced)")
+    parser.add_argument('--c2-ratio', nargs='+', type=float, default=[0.5], help="C2/C1 ratios to try")
+    parser.add_argument('--voltage', type=float, default=230, help="Fundamental voltage across the filter (V)")
+    parser.add_argument('--ssc', type=float, default=5e6, help="Supply short-circuit power (VA)")
+    parser.add_argument('--f-base', type=float, default=50)
+    parser.add_argument('--spectrum', help="CSV with Harmonic and Voltage columns (default: 1,3,5,7 example)")
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--out', default='c_type_pareto.csv')
+    args = parser.parse_args(argv)
+
+    if args.spectrum:
+        df_csv = pd.read_csv(args.spectrum)
+        harmonics, V_harmonics = df_csv['Harmonic'].tolist(), df_csv['Voltage'].tolist()
+    else:
+        harmonics, V_harmonics = [1, 3, 5, 7], [args.voltage, 10, 5, 3]
+
+    designs = design_grid(np.linspace(args.orders[0], args.orders[1], int(args.orders[2])),
+                          np.geomspace(args.q[0], args.q[1], int(args.q[2])),
+                          np.geomspace(args.rating[0], args.rating[1], int(args.rating[2])),
+                          args.c2_ratio)
+    started = time.perf_counter()
+    front = explore_designs(designs, harmonics, V_harmonics, args.voltage, args.ssc, args.f_base, args.workers)
+    elapsed = time.perf_counter() - started
+
+    front.to_csv(args.out, index=False)
+    print(front.head(10).to_string(index=False))
+    print(f"{len(designs)} designs evaluated in {elapsed:.1f} s, {len(front)} Pareto-optimal saved to {args.out}")
+
+if __name__ == "__main__":
+    sys.exit(main())
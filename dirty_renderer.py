@@ -0,0 +1,151 @@
+"""
+Dirty-rectangle renderer for the pygame animations.
+Features:
+- Restores only the background under last frame's sprites and updates only changed regions
+  (falls back to a full flip when most of the window changed)
+- Pre-rendered, cached light surfaces (solid or glowing discs) in place of per-frame circle drawing;
+  glows are blitted additively, so overlapping lights brighten each other
+- Frame-time overlay: work time per frame against the frame budget, with a recent-history
+  graph (toggle with F3 in the animations)
+"""
+
+import time
+from collections import deque
+
+import pygame
+
+
+class DirtyRenderer:
+    def __init__(self, screen, background=(0, 0, 0), fps=60, overlay=False, full_update_share=0.6):
+        """
+        background is a colour or a surface the size of the screen. Everything drawn through
+        blit() is erased at the start of the next frame by restoring that background.
+        """
+        self.screen = screen
+        self.size = screen.get_size()
+        if isinstance(background, pygame.Surface):
+            self.background = background.convert()
+        else:
+            self.background = pygame.Surface(self.size).convert()
+            self.background.fill(background)
+        self.screen_rect = screen.get_rect()
+        self.full_update_area = full_update_share * self.size[0] * self.size[1]
+        self.previous = []
+        self.current = []
+        self.overlay = FrameTimeOverlay(1000.0 / fps)
+        self.overlay_visible = overlay
+        self.frame_started = None
+        self.screen.blit(self.background, (0, 0))
+        pygame.display.flip()
+
+    def begin_frame(self):
+        self.frame_started = time.perf_counter()
+        for rect in self.previous:
+            self.screen.blit(self.background, rect, rect)
+        self.current = []
+
+    def blit(self, surface, dest, area=None, special_flags=0):
+        rect = self.screen.blit(surface, dest, area, special_flags)
+        self.mark(rect)
+        return rect
+
+    def mark(self, rect):
+        # Anything drawn directly on the screen must be marked to be shown and later erased
+        rect = pygame.Rect(rect).clip(self.screen_rect)
+        if rect.width and rect.height:
+            self.current.append(rect)
+
+    def end_frame(self):
+        if self.overlay_visible:
+            self.mark(self.overlay.draw(self.screen))
+        dirty = self.previous + self.current
+        if sum(r.width * r.height for r in dirty) > self.full_update_area:
+            pygame.display.flip()
+        else:
+            pygame.display.update(dirty)
+        self.previous = self.current
+        if self.frame_started is not None:
+            self.overlay.record(time.perf_counter() - self.frame_started)
+
+    def toggle_overlay(self):
+        self.overlay_visible = not self.overlay_visible
+
+
+class FrameTimeOverlay:
+    def __init__(self, budget_ms, history=120, position=(8, 8)):
+        self.budget_ms = budget_ms
+        self.times = deque(maxlen=history)
+        self.position = position
+        self.font = pygame.font.Font(None, 20)
+
+    def record(self, seconds):
+        self.times.append(seconds * 1000)
+
+    def draw(self, screen):
+        """Draw the overlay and return its rect."""
+        width, height = self.times.maxlen, 40
+        panel = pygame.Surface((width + 8, height + 26), pygame.SRCALPHA)
+        panel.fill((0, 0, 0, 160))
+        last = self.times[-1] if self.times else 0.0
+        worst = max(self.times) if self.times else 0.0
+        colour = (80, 220, 80) if last <= self.budget_ms else (240, 80, 60)
+        text = self.font.render(f"{last:.1f} ms (max {worst:.1f}) / {self.budget_ms:.1f} ms", True, colour)
+        panel.blit(text, (4, 4))
+        # One bar per recent frame, scaled so the budget line sits at half height
+        budget_y = 22 + height // 2
+        for i, ms in enumerate(self.times):
+            bar = min(height, int(ms / self.budget_ms * height / 2))
+            bar_colour = (80, 220, 80) if ms <= self.budget_ms else (240, 80, 60)
+            pygame.draw.line(panel, bar_colour, (4 + i, 22 + height), (4 + i, 22 + height - bar))
+        pygame.draw.line(panel, (255, 255, 255), (4, budget_y), (4 + width, budget_y))
+        return screen.blit(panel, self.position)
+
+
+class LightCache:
+    """
+    Pre-rendered light discs keyed by colour and radius (snapped to radius_step). Solid discs
+    use a colour key, which blits faster than per-pixel alpha; glow discs are opaque RGB that
+    fades to black at the rim and are blitted with BLEND_RGB_ADD.
+    """
+
+    def __init__(self, radius_step=2, glow=False):
+        self.radius_step = radius_step
+        self.glow = glow
+        self.surfaces = {}
+
+    def get(self, colour, radius):
+        radius = max(self.radius_step, round(radius / self.radius_step) * self.radius_step)
+        key = (tuple(colour), radius)
+        surface = self.surfaces.get(key)
+        if surface is None:
+            surface = self.render(colour, radius)
+            self.surfaces[key] = surface
+        return surface
+
+    def render(self, colour, radius):
+        if self.glow:
+            surface = pygame.Surface((2 * radius, 2 * radius))
+            # Fine enough rings that no banding shows; the brightness falls off towards the rim
+            steps = max(8, radius // 2)
+            for k in range(steps):
+                level = ((k + 1) / steps) ** 2
+                pygame.draw.circle(surface, [int(c * level) for c in colour[:3]], (radius, radius),
+                                   radius * (steps - k) // steps)
+            return surface.convert()
+        key = (0, 0, 0) if tuple(colour[:3]) != (0, 0, 0) else (255, 255, 255)
+        surface = pygame.Surface((2 * radius, 2 * radius))
+        surface.fill(key)
+        pygame.draw.circle(surface, colour, (radius, radius), radius)
+        surface.set_colorkey(key, pygame.RLEACCEL)
+        return surface.convert()
+
+    def prerender(self, colours, radii):
+        for colour in colours:
+            for radius in radii:
+                self.get(colour, radius)
+        return len(self.surfaces)
+
+    def blit(self, renderer, colour, centre, radius):
+        surface = self.get(colour, radius)
+        flags = pygame.BLEND_RGB_ADD if self.glow else 0
+        return renderer.blit(surface, surface.get_rect(center=centre), special_flags=flags)
@@ -0,0 +1,151 @@
+"""
+Fixed-timestep animation engine shared by the pygame animations.
+Features:
+- Scene updates at a fixed step (default 1/60 s) on the music clock (or the wall clock
+  while no music plays), so motion speed no longer depends on the achieved frame rate
+- Render interpolation: scenes are drawn between their last two updates
+- Frame skipping under load: several updates per rendered frame, capped, with the rest of
+  a long stall dropped instead of spiralling
+- Frame-rate cap that sleeps between frames, and idle throttling while the window is minimised
+- Pluggable scenes: any object with handle_event(event), update(t) and draw(alpha)
+
+Usage: python engine.py [polarbear|capybara]
+"""
+
+import argparse
+import importlib.util
+import math
+import os
+import sys
+import time
+
+import pygame
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+STEP = 1 / 60
+IDLE_FPS = 5
+
+# Scene name -> (script, scene class)
+SCENES = {
+    'polarbear': ('polarbear.py', 'PolarBearScene'),
+    'capybara': ('python dancing_capybara.py', 'CapybaraScene'),
+}
+
+# ---------------- Scenes ---------------- #
+
+def load_script(name, filename):
+    # The capybara script's file name contains a space, so scripts are loaded by path
+    spec = importlib.util.spec_from_file_location(name, os.path.join(HERE, filename))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+def load_scene(name):
+    """Script module of a named scene; its scene class is SCENES[name][1]."""
+    if name not in SCENES:
+        raise ValueError(f"Unknown scene: {name}")
+    return load_script(name, SCENES[name][0])
+
+# ---------------- Clock ---------------- #
+
+class MusicClock:
+    """Seconds into the music while it plays, else wall-clock seconds carrying on from there."""
+
+    def __init__(self):
+        self.offset = None  # wall clock minus music time
+
+    def __call__(self):
+        wall = time.perf_counter()
+        if pygame.mixer.get_init() and pygame.mixer.music.get_busy():
+            pos = pygame.mixer.music.get_pos()
+            if pos >= 0:
+                self.offset = wall - pos / 1000.0
+                return pos / 1000.0
+        if self.offset is None:
+            self.offset = wall
+        return wall - self.offset
+
+# ---------------- Engine ---------------- #
+
+class Engine:
+    def __init__(self, scene, fps=60, step=STEP, max_updates=5, idle_fps=IDLE_FPS, time_source=None):
+        """
+        scene.update(t) runs once per `step` seconds of the time source (t is the step's time);
+        scene.draw(alpha) runs once per rendered frame, at most `fps` per second, with alpha
+        in [0, 1) the position between the last two updates. At most max_updates run per frame.
+        """
+        self.scene = scene
+        self.fps = fps
+        self.step = step
+        self.max_updates = max_updates
+        self.idle_fps = idle_fps
+        self.time_source = time_source or MusicClock()
+        # Updates per rendered frame when keeping up; any beyond this are frames skipped under load
+        self.nominal_updates = max(1, round(1.0 / (fps * step)))
+        self.clock = pygame.time.Clock()
+        self.origin = None
+        self.steps = 0
+        self.running = False
+        self.frames = self.updates = self.skipped = self.idle_frames = 0
+        self.dropped = 0.0
+
+    def advance(self, now):
+        """Run the updates due by time `now` and return the interpolation factor for drawing."""
+        self.frames += 1
+        if self.origin is None or now < self.origin + (self.steps - 1) * self.step:
+            # First frame, or the clock went back (music restarted): start again from now
+            self.origin, self.steps = now, 0
+            self.scene.update(now)
+            self.updates += 1
+            return 0.0
+        # Step times are origin + k * step, so rounding never accumulates
+        due = math.floor((now - self.origin) / self.step + 1e-6)
+        if due - self.steps > self.max_updates:
+            # Too far behind to catch up: drop the excess
+            self.dropped += (due - self.steps - self.max_updates) * self.step
+            self.steps = due - self.max_updates
+        updates = 0
+        while self.steps < due:
+            self.steps += 1
+            self.scene.update(self.origin + self.steps * self.step)
+            updates += 1
+        self.updates += updates
+        self.skipped += max(0, updates - self.nominal_updates)
+        return min(1.0, max(0.0, (now - self.origin) / self.step - self.steps))
+
+    def run(self):
+        """Run until the window is closed and return the engine report."""
+        self.running = True
+        while self.running:
+            for event in pygame.event.get():
+                if event.type == pygame.QUIT:
+                    self.running = False
+                else:
+                    self.scene.handle_event(event)
+            if not pygame.display.get_active():
+                # Minimised: keep handling events, but neither update nor draw
+                self.idle_frames += 1
+                self.clock.tick(self.idle_fps)
+                continue
+            alpha = self.advance(self.time_source())
+            self.scene.draw(alpha)
+            self.clock.tick(self.fps)
+        return self.report()
+
+    def stop(self):
+        self.running = False
+
+    def report(self):
+        return (f"engine: {self.frames} frames, {self.updates} updates, {self.skipped} skipped frames, "
+                f"{self.dropped:.2f} s dropped, {self.idle_frames} idle frames")
+
+# ---------------- CLI Mode ---------------- #
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run one of the animations on the shared engine.")
+    parser.add_argument('scene', choices=sorted(SCENES))
+    args = parser.parse_args(argv)
+    load_scene(args.scene).main()
+
+if __name__ == "__main__":
+    sys.exit(main())
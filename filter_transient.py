@@ -0,0 +1,271 @@
+"""
+Time-domain energisation transients for the harmonic filter circuits.
+Features:
+- State-space models of the series/shunt circuits of MaxHarmonicCurrent.py and the
+  C-type filter of Harmonic.py, each behind an optional source impedance (Rs, Ls)
+- Source built from a harmonic spectrum or a sampled one-cycle waveform
+- Fixed-step trapezoidal (implicit, A-stable) integration
+- Every closing angle integrated at once, so the worst-case inrush and overvoltage over
+  360 closing angles comes out of a single run
+- Peaks compared against the phasor steady state (inrush/overvoltage factors)
+
+All circuits start de-energised (zero inductor currents and capacitor voltages) and the
+breaker closes at t = 0 at the given point on the fundamental cycle.
+"""
+
+import argparse
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+# ---------------- Circuit Models ---------------- #
+
+def _model(A, B, C, D, states, outputs):
+    return {'A': np.array(A, dtype=float), 'B': np.array(B, dtype=float),
+            'C': np.array(C, dtype=float), 'D': np.array(D, dtype=float),
+            'states': states, 'outputs': outputs}
+
+def series_rlc_model(C, L, R, Ls=0.0, Rs=0.0):
+    """Series configuration: source, R, L and C in one loop. States: current, capacitor voltage."""
+    L_loop, R_loop = L + Ls, R + Rs
+    if L_loop <= 0:
+        raise ValueError("Series energisation needs L or a source inductance Ls > 0")
+    if C <= 0:
+        raise ValueError("Series energisation needs C > 0")
+    A = [[-R_loop / L_loop, -1 / L_loop],
+         [1 / C, 0]]
+    B = [1 / L_loop, 0]
+    outputs = ['I_source', 'V_C', 'V_L']
+    # V_L = L di/dt = (L / L_loop) * (v - R_loop i - v_C)
+    k = L / L_loop
+    Cm = [[1, 0], [0, 1], [-k * R_loop, -k]]
+    D = [0, 0, k]
+    return _model(A, B, Cm, D, ['i', 'v_C'], outputs)
+
+def shunt_rlc_model(C, L, R, Ls, Rs=0.0):
+    """
+    Shunt configuration: R, L and C each across the bus, fed through Rs + Ls.
+    Branches with a zero value are left out, as in the steady-state calculation.
+    States: source current, bus (capacitor) voltage and, with L, the inductor current.
+    """
+    if Ls <= 0 or C <= 0:
+        raise ValueError("Shunt energisation needs C > 0 and a source inductance Ls > 0")
+    G = 1 / R if R > 0 else 0.0
+    states = ['i_source', 'v_bus']
+    A = [[-Rs / Ls, -1 / Ls],
+         [1 / C, -G / C]]
+    B = [1 / Ls, 0]
+    Cm = [[1, 0], [0, 1], [1, -G]]
+    outputs = ['I_source', 'V_bus', 'I_C']
+    if L > 0:
+        states.append('i_L')
+        A = [A[0] + [0], A[1] + [-1 / C], [0, 1 / L, 0]]
+        B = B + [0]
+        Cm = [row + [0] for row in Cm]
+        Cm[2][2] = -1
+        Cm.append([0, 0, 1])
+        outputs.append('I_L')
+    return _model(A, B, Cm, [0] * len(outputs), states, outputs)
+
+def c_type_model(L, C1, C2, R, Ls=0.0, Rs=0.0):
+    """
+    C-type filter of Harmonic.py: L in series with C1 || (R + C2), fed through Rs + Ls.
+    States: source current, C1 voltage, C2 voltage.
+    """
+    L_loop = L + Ls
+    if L_loop <= 0:
+        raise ValueError("C-type energisation needs L or a source inductance Ls > 0")
+    if C1 <= 0 or C2 <= 0:
+        raise ValueError("C-type energisation needs C1 > 0 and C2 > 0")
+    if R <= 0:
+        # With R = 0 the capacitor voltages are tied together and the state equations divide by zero
+        raise ValueError("C-type energisation needs R > 0")
+    A = [[-Rs / L_loop, -1 / L_loop, 0],
+         [1 / C1, -1 / (R * C1), 1 / (R * C1)],
+         [0, 1 / (R * C2), -1 / (R * C2)]]
+    B = [1 / L_loop, 0, 0]
+    k = L / L_loop
+    outputs = ['I_source', 'V_C1', 'V_C2', 'V_R', 'I_branch', 'V_L']
+    Cm = [[1, 0, 0], [0, 1, 0], [0, 0, 1], [0, 1, -1], [0, 1 / R, -1 / R], [-k * Rs, -k, 0]]
+    D = [0, 0, 0, 0, 0, k]
+    return _model(A, B, Cm, D, ['i_source', 'v_C1', 'v_C2'], outputs)
+
+# ---------------- Source Waveforms ---------------- #
+
+def spectrum_source(harmonics, V_harmonics, phases=None, f_base=50):
+    """
+    Source v(theta, t) = sum sqrt(2) V_h sin(h (w t + theta) + phase_h), V_h RMS, phases in degrees.
+    Returns a function of (closing angles in radians, times) giving an (angles, times) array.
+    """
+    h = np.asarray(harmonics, dtype=float)
+    amplitude = np.sqrt(2) * np.asarray(V_harmonics, dtype=float)
+    phase = np.radians(np.zeros_like(h) if phases is None else np.asarray(phases, dtype=float))
+    omega = 2 * np.pi * f_base
+
+    def source(theta, t):
+        wt = omega * t[np.newaxis, :] + theta[:, np.newaxis]
+        v = np.zeros(wt.shape)
+        for h_k, a_k, p_k in zip(h, amplitude, phase):
+            v += a_k * np.sin(h_k * wt + p_k)
+        return v
+    return source
+
+def sampled_source(cycle, f_base=50):
+    """Source from one fundamental cycle of uniformly spaced samples, repeated periodically."""
+    cycle = np.asarray(cycle, dtype=float)
+    period = 1 / f_base
+    t_samples = np.arange(len(cycle)) * period / len(cycle)
+
+    def source(theta, t):
+        shifted = t[np.newaxis, :] + theta[:, np.newaxis] / (2 * np.pi * f_base)
+        return np.interp(shifted.ravel(), t_samples, cycle, period=period).reshape(shifted.shape)
+    return source
+
+# ---------------- Integration ---------------- #
+
+def default_time_step(model, f_base=50, steps_per_cycle=400):
+    # About 60 steps per period of the fastest natural frequency of the circuit
+    fastest = np.max(np.abs(np.linalg.eigvals(model['A'])))
+    return min(1 / (f_base * steps_per_cycle), 0.1 / fastest)
+
+def simulate(model, source, angles_deg, duration, dt, keep=None):
+    """
+    Integrate dx/dt = A x + B v with the trapezoidal rule for every closing angle at once.
+
+    Returns a dict with 'angles', 'peak' (angles, outputs) of |y| over the run and, with
+    keep a list of output names, 'time' and 'waveforms' {name: (angles, steps + 1)}.
+    """
+    A, B, Cm, D = model['A'], model['B'], model['C'], model['D']
+    n = len(A)
+    theta = np.radians(np.asarray(angles_deg, dtype=float))
+    steps = int(np.ceil(duration / dt))
+    t = np.arange(steps + 1) * dt
+    v = source(theta, t)
+
+    # x[k+1] = M x[k] + N (v[k] + v[k+1]) with M = (I - dt/2 A)^-1 (I + dt/2 A), N = (I - dt/2 A)^-1 dt/2 B
+    lhs = np.eye(n) - dt / 2 * A
+    M = np.linalg.solve(lhs, np.eye(n) + dt / 2 * A)
+    N = np.linalg.solve(lhs, dt / 2 * B)
+    MT, CT = M.T, Cm.T
+
+    x = np.zeros((len(theta), n))
+    peak = np.abs(v[:, :1] * D)
+    keep_idx = [model['outputs'].index(name) for name in keep or []]
+    waveforms = np.zeros((len(keep_idx), len(theta), steps + 1)) if keep_idx else None
+    if keep_idx:
+        waveforms[:, :, 0] = (v[:, :1] * D)[:, keep_idx].T
+    drive = v[:, :-1] + v[:, 1:]
+    for k in range(steps):
+        x = x @ MT + drive[:, k, np.newaxis] * N
+        y = x @ CT + v[:, k + 1, np.newaxis] * D
+        np.maximum(peak, np.abs(y), out=peak)
+        if keep_idx:
+            waveforms[:, :, k + 1] = y[:, keep_idx].T
+
+    result = {'angles': np.asarray(angles_deg, dtype=float), 'peak': peak}
+    if keep_idx:
+        result['time'] = t
+        result['waveforms'] = dict(zip(keep or [], waveforms))
+    return result
+
+def steady_state_peaks(model, harmonics, V_harmonics, phases=None, f_base=50, points=2000):
+    """Peak of every output over one cycle in the phasor steady state, from H(jw) = C (jwI - A)^-1 B + D."""
+    h = np.asarray(harmonics, dtype=float)
+    V = np.sqrt(2) * np.asarray(V_harmonics, dtype=float) * np.exp(
+        1j * np.radians(np.zeros_like(h) if phases is None else np.asarray(phases, dtype=float)))
+    jw = 1j * 2 * np.pi * f_base * h
+    n = len(model['A'])
+    X = np.linalg.solve(jw[:, None, None] * np.eye(n) - model['A'], np.broadcast_to(model['B'], (len(h), n))[..., None])[..., 0]
+    Y = (X @ model['C'].T + model['D']) * V[:, None]  # (harmonics, outputs), sine-referenced phasors
+    wt = np.linspace(0, 2 * np.pi, points, endpoint=False)
+    y = np.imag(Y[:, :, None] * np.exp(1j * h[:, None, None] * wt)).sum(axis=0)
+    return np.abs(y).max(axis=1)
+
+def energisation_study(model, harmonics, V_harmonics, phases=None, f_base=50, angles=360, cycles=5,
+                       dt=None, source=None):
+    """
+    Worst-case energisation over evenly spaced closing angles.
+
+    Returns (table, worst): table has one row per closing angle with the peak of every
+    output, worst has per output the highest peak, the angle it occurs at, the steady-state
+    peak and their ratio. A sampled source may replace the spectrum (its steady state is
+    then not computed).
+    """
+    angles_deg = np.arange(angles) * 360 / angles
+    if source is None:
+        source = spectrum_source(harmonics, V_harmonics, phases, f_base)
+        steady = steady_state_peaks(model, harmonics, V_harmonics, phases, f_base)
+    else:
+        steady = np.full(len(model['outputs']), np.nan)
+    dt = dt or default_time_step(model, f_base)
+    result = simulate(model, source, angles_deg, cycles / f_base, dt)
+
+    table = pd.DataFrame(result['peak'], columns=[f'{name} Peak' for name in model['outputs']])
+    table.insert(0, 'Closing Angle (deg)', angles_deg)
+    worst_idx = np.argmax(result['peak'], axis=0)
+    worst = pd.DataFrame({
+        'Output': model['outputs'],
+        'Worst Peak': result['peak'][worst_idx, np.arange(len(model['outputs']))],
+        'Closing Angle (deg)': angles_deg[worst_idx],
+        'Steady-State Peak': steady,
+    })
+    worst['Transient Factor'] = worst['Worst Peak'] / worst['Steady-State Peak']
+    return table, worst
+
+# ---------------- CLI Mode ---------------- #
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Worst-case filter energisation transients over closing angles.")
+    parser.add_argument('circuit', choices=['series', 'shunt', 'c-type'])
+    parser.add_argument('--C', type=float, help="Capacitance (F), series/shunt")
+    parser.add_argument('--L', type=float, default=0.0, help="Inductance (H)")
+    parser.add_argument('--R', type=float, default=0.0, help="Resistance (Ohms)")
+    parser.add_argument('--C1', type=float, help="C-type main capacitor (F)")
+    parser.add_argument('--C2', type=float, help="C-type tuning capacitor (F)")
+    parser.add_argument('--Ls', type=float, default=0.0, help="Source inductance (H)")
+    parser.add_argument('--Rs', type=float, default=0.0, help="Source resistance (Ohms)")
+    parser.add_argument('--f-base', type=float, default=50)
+    parser.add_argument('--spectrum', help="CSV with Harmonic, Voltage (RMS) and optional Phase (deg) columns")
+    parser.add_argument('--waveform', help="CSV with a Voltage column holding one sampled fundamental cycle")
+    parser.add_argument('--voltage', type=float, default=230, help="Fundamental RMS voltage without a spectrum")
+    parser.add_argument('--angles', type=int, default=360, help="Closing angles spread over one cycle")
+    parser.add_argument('--cycles', type=float, default=5, help="Simulated cycles after closing")
+    parser.add_argument('--dt', type=float, help="Time step (s), default from the circuit's natural frequencies")
+    parser.add_argument('--out', default='energisation_peaks.csv')
+    args = parser.parse_args(argv)
+
+    required = ['C1', 'C2'] if args.circuit == 'c-type' else ['C']
+    missing = [f'--{name}' for name in required if getattr(args, name) is None]
+    if missing:
+        parser.error(f"{args.circuit} circuit needs {', '.join(missing)}")
+    try:
+        if args.circuit == 'series':
+            model = series_rlc_model(args.C, args.L, args.R, args.Ls, args.Rs)
+        elif args.circuit == 'shunt':
+            model = shunt_rlc_model(args.C, args.L, args.R, args.Ls, args.Rs)
+        else:
+            model = c_type_model(args.L, args.C1, args.C2, args.R, args.Ls, args.Rs)
+    except ValueError as e:
+        parser.error(str(e))
+
+    harmonics, V_harmonics, phases, source = [1], [args.voltage], None, None
+    if args.spectrum:
+        df_csv = pd.read_csv(args.spectrum)
+        harmonics, V_harmonics = df_csv['Harmonic'].tolist(), df_csv['Voltage'].tolist()
+        phases = df_csv['Phase'].tolist() if 'Phase' in df_csv else None
+    if args.waveform:
+        source = sampled_source(pd.read_csv(args.waveform)['Voltage'].to_numpy(float), args.f_base)
+
+    started = time.perf_counter()
+    table, worst = energisation_study(model, harmonics, V_harmonics, phases, args.f_base, args.angles,
+                                      args.cycles, args.dt, source)
+    elapsed = time.perf_counter() - started
+
+    table.to_csv(args.out, index=False)
+    print(worst.to_string(index=False))
+    print(f"{args.angles} closing angles simulated in {elapsed:.2f} s, peaks saved to {args.out}")
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,164 @@
+"""
+Non-interactive batch mode for the harmonic calculator.
+Features:
+- Input is a manifest CSV (one row per spectrum file with its parameters) or a directory of spectrum CSVs
+- Cases processed across a process pool
+- Per-case results (and optional plots) written to their own folder
+- One aggregated THD summary table and throughput in cases per second
+- Typed CSV, Parquet or Arrow outputs (the latter two need pyarrow)
+
+Manifest columns: file, and optionally case, site, fundamental_freq, C, L, R, config.
+Missing parameters fall back to the command-line defaults. Case names (default: the file's
+relative path) become single folder names, with a repeated name suffixed by its row number.
+"""
+
+import argparse
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from MaxHarmonicCurrent import process_data, generate_plots, parse_plot_formats, make_summary, write_results, write_table, RESULT_FORMATS
+
+PARAMETERS = ['fundamental_freq', 'C', 'L', 'R', 'config']
+
+# ---------------- Case Discovery ---------------- #
+
+def safe_case_name(name):
+    # Output folders are one level below --out: separators become '__', '.' and '..' are dropped
+    parts = [p for p in re.split(r'[\\/]+', str(name)) if p not in ('', '.', '..')]
+    return '__'.join(parts) or 'case'
+
+def assign_case_names(cases):
+    """
+    Make every case name a safe, unique folder name. A repeated name (e.g. one spectrum file
+    listed twice with different filter parameters) gets its manifest row number appended.
+    """
+    seen = set()
+    for i, case in enumerate(cases):
+        name = safe_case_name(case['case'])
+        if name in seen:
+            name = f"{name}_row{i + 1}"
+        while name in seen:
+            name += '_'
+        seen.add(name)
+        case['case'] = name
+    return cases
+
+def load_manifest(path, defaults):
+    manifest = pd.read_csv(path)
+    base = os.path.dirname(os.path.abspath(path))
+    cases = []
+    for row in manifest.to_dict('records'):
+        case = dict(defaults)
+        case.update({k: v for k, v in row.items() if not (isinstance(v, float) and pd.isna(v))})
+        case['file'] = os.path.join(base, case['file'])
+        case.setdefault('case', os.path.splitext(os.path.relpath(case['file'], base))[0])
+        cases.append(case)
+    return assign_case_names(cases)
+
+def discover_directory(path, defaults):
+    # Every CSV below the directory is a case; the first sub-folder is taken as the site
+    cases = []
+    for root, _, files in os.walk(path):
+        for name in sorted(files):
+            if not name.lower().endswith('.csv'):
+                continue
+            file_path = os.path.join(root, name)
+            relative = os.path.relpath(file_path, path)
+            case = dict(defaults)
+            case['file'] = file_path
+            case['case'] = os.path.splitext(relative)[0]
+            parts = relative.split(os.sep)
+            case['site'] = parts[0] if len(parts) > 1 else ''
+            cases.append(case)
+    return assign_case_names(cases)
+
+# ---------------- Worker ---------------- #
+
+def process_case(case):
+    """Run one spectrum file through process_data and write its outputs; errors are recorded, not raised."""
+    summary = {'case': case['case'], 'site': case.get('site', ''), 'file': case['file']}
+    summary.update({k: case.get(k) for k in PARAMETERS})
+    try:
+        out_dir = os.path.join(case['out_root'], case['case'])
+        os.makedirs(out_dir, exist_ok=True)
+        df_csv = pd.read_csv(case['file'])
+        harmonics = df_csv['Harmonic'].tolist()
+        voltages = df_csv['Voltage'].tolist()
+        df, v_thd, i_thd = process_data(float(case['fundamental_freq']), float(case['C']), float(case['L']),
+                                        float(case['R']), harmonics, voltages, str(case['config']).strip().lower())
+        summary_record = make_summary(case['fundamental_freq'], case['C'], case['L'], case['R'], case['config'], v_thd, i_thd)
+        results_path, _ = write_results(df, summary_record, os.path.join(out_dir, 'harmonic_results'), case['results_format'])
+        generate_plots(df, case['config'], case['plot_formats'], out_dir=out_dir)
+        summary.update({'Harmonics': len(harmonics), 'Voltage THD (%)': v_thd, 'Current THD (%)': i_thd,
+                        'Output': results_path, 'Error': ''})
+    except Exception as e:
+        summary.update({'Harmonics': 0, 'Voltage THD (%)': float('nan'), 'Current THD (%)': float('nan'),
+                        'Output': '', 'Error': f"{type(e).__name__}: {e}"})
+    return summary
+
+# ---------------- Batch Run ---------------- #
+
+def run_batch(cases, out_root, workers=None, plot_formats=(), results_format='csv'):
+    os.makedirs(out_root, exist_ok=True)
+    for case in cases:
+        case['out_root'] = out_root
+        case['plot_formats'] = plot_formats
+        case['results_format'] = results_format
+    started = time.perf_counter()
+    workers = workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        chunksize = max(1, len(cases) // (workers * 8))
+        summaries = list(pool.map(process_case, cases, chunksize=chunksize))
+    elapsed = time.perf_counter() - started
+    summary = pd.DataFrame(summaries)
+    summary_path = os.path.join(out_root, f'thd_summary{RESULT_FORMATS[results_format]}')
+    write_table(summary, summary_path, results_format)
+    return summary, summary_path, elapsed
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Batch harmonic calculations over many spectrum files.")
+    parser.add_argument('source', help="Manifest CSV or directory of spectrum CSVs (columns Harmonic, Voltage)")
+    parser.add_argument('--out', default='harmonic_batch_results', help="Output directory")
+    parser.add_argument('--fundamental', type=float, default=50.0, help="Default fundamental frequency (Hz)")
+    parser.add_argument('--C', type=float, help="Default capacitance (F)")
+    parser.add_argument('--L', type=float, help="Default inductance (H)")
+    parser.add_argument('--R', type=float, help="Default resistance (Ohms)")
+    parser.add_argument('--config', default='series', choices=['series', 'shunt'])
+    parser.add_argument('--workers', type=int, help="Worker processes (default: all cores)")
+    parser.add_argument('--plots', default='none', help="Plot outputs per case: png,json,html or none")
+    parser.add_argument('--format', default='csv', choices=sorted(RESULT_FORMATS), help="Results table format")
+    args = parser.parse_args(argv)
+
+    if args.format != 'csv':
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            parser.error(f"--format {args.format} needs pyarrow (pip install pyarrow)")
+
+    defaults = {'fundamental_freq': args.fundamental, 'C': args.C, 'L': args.L, 'R': args.R, 'config': args.config}
+    if os.path.isdir(args.source):
+        cases = discover_directory(args.source, defaults)
+    else:
+        cases = load_manifest(args.source, defaults)
+    if not cases:
+        print(f"No cases found in {args.source}", file=sys.stderr)
+        return 1
+    missing = [c['case'] for c in cases if any(c.get(k) is None for k in PARAMETERS)]
+    if missing:
+        parser.error(f"No C/L/R given for {len(missing)} case(s), e.g. {missing[0]}")
+
+    summary, summary_path, elapsed = run_batch(cases, args.out, args.workers, parse_plot_formats(args.plots), args.format)
+    failed = summary[summary['Error'] != '']
+    by_site = summary.groupby('site')[['Voltage THD (%)', 'Current THD (%)']].agg(['mean', 'max'])
+    print(by_site.to_string())
+    print(f"Summary saved to {summary_path}")
+    print(f"{len(cases)} cases in {elapsed:.2f} s ({len(cases) / max(elapsed, 1e-9):.1f} cases/s), {len(failed)} failed")
+    return 1 if len(failed) else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
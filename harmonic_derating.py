@@ -0,0 +1,91 @@
+"""
+Harmonic derating for four/five-core cables (BS 7671 Appendix 4, Table 4Aa).
+Features:
+- Third harmonic content from a harmonic current spectrum or a THD figure
+- Neutral current due to third harmonic currents
+- Reduction factor and sizing current (phase or neutral based)
+- Works on whole arrays of circuits at once so a full board is sized in one pass
+"""
+
+import numpy as np
+
+# Table 4Aa: (upper limit of third harmonic content %, reduction factor, size on neutral current)
+HARMONIC_BANDS = [
+    (15.0, 1.00, False),
+    (33.0, 0.86, False),
+    (45.0, 0.86, True),
+    (np.inf, 1.00, True),
+]
+
+# ---------------- Spectrum Analysis ---------------- #
+
+def third_harmonic_content(harmonics, currents):
+    """
+    Third harmonic content (%) of the phase current for each circuit.
+
+    harmonics is a 1-D array of harmonic orders (the fundamental must be order 1)
+    and currents is a (circuits, harmonics) array of current magnitudes.
+    """
+    harmonics = np.asarray(harmonics, dtype=float)
+    currents = np.atleast_2d(np.asarray(currents, dtype=float))
+    fundamental = currents[:, harmonics == 1].sum(axis=1)
+    third = currents[:, harmonics == 3].sum(axis=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        content = np.where(fundamental > 0, third / fundamental * 100, 0.0)
+    return content
+
+def thd_to_third_harmonic(thd):
+    """
+    Conservative third harmonic content (%) when only the current THD is known.
+    The whole distortion is assumed to be triplen, which gives the largest neutral current.
+    """
+    return np.asarray(thd, dtype=float)
+
+# ---------------- Derating ---------------- #
+
+def neutral_current(Ib, third_content):
+    """Neutral current (A) of a balanced three-phase circuit: three times the third harmonic phase current."""
+    return 3 * np.asarray(Ib, dtype=float) * np.asarray(third_content, dtype=float) / 100
+
+def harmonic_reduction(Ib, third_content, three_phase=True, In=None):
+    """
+    Apply Table 4Aa to arrays of circuits.
+
+    Returns (sizing_current, reduction_factor, neutral_based, I_N). The sizing current is
+    the protective device rating In (Ib when not given) on a phase basis, or the larger of
+    In and the neutral current where the table calls for neutral-based sizing; the tabulated
+    capacity must be at least sizing_current / (reduction_factor * other factors).
+    Single-phase circuits (three_phase False) are not derated.
+    """
+    Ib = np.asarray(Ib, dtype=float)
+    In = Ib if In is None else np.broadcast_to(np.asarray(In, dtype=float), Ib.shape)
+    third_content = np.broadcast_to(np.asarray(third_content, dtype=float), Ib.shape)
+    three_phase = np.broadcast_to(np.asarray(three_phase, dtype=bool), Ib.shape)
+
+    limits = np.array([band[0] for band in HARMONIC_BANDS])
+    factors = np.array([band[1] for band in HARMONIC_BANDS])
+    on_neutral = np.array([band[2] for band in HARMONIC_BANDS])
+    band = np.searchsorted(limits, third_content, side='left')
+
+    I_N = np.where(three_phase, neutral_current(Ib, third_content), 0.0)
+    neutral_based = three_phase & on_neutral[band]
+    Ch = np.where(three_phase, factors[band], 1.0)
+    sizing_current = np.where(neutral_based, np.maximum(In, I_N), In)
+    return sizing_current, Ch, neutral_based, I_N
+
+# ---------------- Size Selection ---------------- #
+
+def select_sizes(required_Iz, sizes, capacities):
+    """
+    Smallest cable size whose tabulated capacity meets required_Iz, for every circuit.
+    sizes/capacities come straight from one column of the cable table; NaN means no size fits.
+    """
+    sizes = np.asarray(sizes, dtype=float)
+    capacities = np.asarray(capacities, dtype=float)
+    order = np.argsort(sizes)
+    sizes = sizes[order]
+    # Capacity can only grow with size, so a running maximum keeps the search monotonic
+    best = np.maximum.accumulate(capacities[order])
+    index = np.searchsorted(best, np.asarray(required_Iz, dtype=float), side='left')
+    fits = index < len(sizes)
+    return np.where(fits, sizes[np.minimum(index, len(sizes) - 1)], np.nan)
@@ -0,0 +1,245 @@
+"""
+Filter component optimiser for the series/shunt harmonic calculator.
+Features:
+- Searches (C, L, R) to minimise current THD or a weighted harmonic-current target
+- Continuous log-spaced ranges or standard E6/E12/E24 component values
+- Vectorized coarse grid (process_data_array) spread across cores, then local refinement
+- Pareto set of objective against component size (fundamental reactive rating)
+- Designs tuned below --min-tuning are rejected: one resonant at the fundamental trivially
+  minimises THD by maximising the fundamental current
+"""
+
+import argparse
+import math
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from MaxHarmonicCurrent import process_data_array
+
+E_SERIES = {
+    'E6': [1.0, 1.5, 2.2, 3.3, 4.7, 6.8],
+    'E12': [1.0, 1.2, 1.5, 1.8, 2.2, 2.7, 3.3, 3.9, 4.7, 5.6, 6.8, 8.2],
+    'E24': [1.0, 1.1, 1.2, 1.3, 1.5, 1.6, 1.8, 2.0, 2.2, 2.4, 2.7, 3.0,
+            3.3, 3.6, 3.9, 4.3, 4.7, 5.1, 5.6, 6.2, 6.8, 7.5, 8.2, 9.1],
+}
+
+DEFAULT_RANGES = {'C': (1e-6, 1e-3), 'L': (1e-4, 1e-1), 'R': (1e-2, 10.0)}
+MIN_TUNING = 2.0  # lowest accepted L-C resonance, in harmonic orders
+MIN_CHUNK = 2000  # smallest coarse-grid chunk worth sending to a worker process
+
+# ---------------- Candidate Values ---------------- #
+
+def standard_values(series, lo, hi):
+    """All values of an E series between lo and hi."""
+    decades = np.arange(np.floor(np.log10(lo)), np.ceil(np.log10(hi)) + 1)
+    values = (np.array(E_SERIES[series])[None, :] * 10.0 ** decades[:, None]).ravel()
+    values = np.array([float(f'{v:.3g}') for v in values])
+    return values[(values >= lo * (1 - 1e-9)) & (values <= hi * (1 + 1e-9))]
+
+def candidate_axes(ranges, standard=None, points=30):
+    if standard:
+        return {k: standard_values(standard, *ranges[k]) for k in ('C', 'L', 'R')}
+    return {k: np.geomspace(*ranges[k], points) for k in ('C', 'L', 'R')}
+
+# ---------------- Objective ---------------- #
+
+def evaluate(fundamental_freq, C, L, R, harmonics, voltages, config, weights=None, min_tuning=MIN_TUNING):
+    """
+    Objective and size for arrays of (C, L, R) sets.
+    Objective is the current THD (%), or with weights {harmonic: weight} the weighted
+    RMS harmonic current (A); it is inf for designs whose L-C resonance lies below min_tuning
+    times the fundamental. Size is the fundamental reactive rating of C plus L in kVA.
+    """
+    result = process_data_array(fundamental_freq, C, L, R, harmonics, voltages, config)
+    current = result['series_current']
+    if weights:
+        w = np.array([weights.get(h, 0.0) for h in harmonics], dtype=float)
+        objective = np.sqrt(np.sum(w * current ** 2, axis=-1))
+    else:
+        objective = result['current_thd']
+
+    V1 = float(np.asarray(voltages, dtype=float)[0])
+    X_C1, X_L1 = result['X_C'][..., 0], result['X_L'][..., 0]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        if config == 'shunt':
+            q_C = np.where(np.isfinite(X_C1), V1 ** 2 / X_C1, 0.0)
+            q_L = np.where(X_L1 > 0, V1 ** 2 / X_L1, 0.0)
+        else:
+            I1 = current[..., 0]
+            q_C = np.where(np.isfinite(X_C1), I1 ** 2 * X_C1, 0.0)
+            q_L = I1 ** 2 * X_L1
+        # The objective is the series R-L-C current in both configurations, so a design
+        # resonant near the fundamental (order sqrt(X_C1 / X_L1)) is rejected in both
+        objective = np.where(X_C1 >= min_tuning ** 2 * X_L1, objective, np.inf)
+    return objective, (q_C + q_L) / 1000
+
+def _evaluate_chunk(args):
+    fundamental_freq, C, L, R, harmonics, voltages, config, weights, min_tuning = args
+    return evaluate(fundamental_freq, C, L, R, harmonics, voltages, config, weights, min_tuning)
+
+# ---------------- Search ---------------- #
+
+def coarse_search(axes, fundamental_freq, harmonics, voltages, config, weights=None, workers=None, chunk=None,
+                  min_tuning=MIN_TUNING):
+    C, L, R = (g.ravel() for g in np.meshgrid(axes['C'], axes['L'], axes['R'], indexing='ij'))
+    workers = workers or os.cpu_count() or 1
+    # About four chunks per worker keeps every core busy; tiny grids stay in this process
+    chunk = chunk or max(MIN_CHUNK, math.ceil(len(C) / (workers * 4)))
+    tasks = [(fundamental_freq, C[i:i + chunk], L[i:i + chunk], R[i:i + chunk], harmonics, voltages, config, weights,
+              min_tuning) for i in range(0, len(C), chunk)]
+    if workers == 1 or len(tasks) == 1:
+        parts = [_evaluate_chunk(t) for t in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            parts = list(pool.map(_evaluate_chunk, tasks))
+    objective = np.concatenate([p[0] for p in parts])
+    size = np.concatenate([p[1] for p in parts])
+    return C, L, R, objective, size
+
+def refine(starts, axes, fundamental_freq, harmonics, voltages, config, weights=None, standard=None, max_iter=60,
+           min_tuning=MIN_TUNING):
+    """
+    Pattern search from each start point, all starts stepped together.
+    Continuous mode moves each axis by a multiplicative step in log space, starting at that
+    axis's own grid spacing, and halves the steps when stuck;
+    standard mode moves one position along each E-series axis.
+    Returns every evaluated point so the Pareto set can use them too.
+    """
+    offsets = np.array(np.meshgrid([-1, 0, 1], [-1, 0, 1], [-1, 0, 1], indexing='ij')).reshape(3, -1).T
+    offsets = offsets[np.any(offsets != 0, axis=1)]
+    names = ('C', 'L', 'R')
+    seen = []
+
+    if standard:
+        index = np.array([[np.argmin(np.abs(axes[k] - p[i])) for i, k in enumerate(names)] for p in starts])
+        limits = np.array([len(axes[k]) - 1 for k in names])
+
+        def values(idx):
+            return [axes[k][idx[..., i]] for i, k in enumerate(names)]
+    else:
+        log_point = np.log(np.asarray(starts, dtype=float))
+        bounds = np.log(np.array([[axes[k][0], axes[k][-1]] for k in names]))
+        spacing = (bounds[:, 1] - bounds[:, 0]) / np.maximum([len(axes[k]) - 1 for k in names], 1)
+        step = np.tile(spacing, (len(starts), 1))
+
+    current = np.asarray(starts, dtype=float)
+    best, _ = evaluate(fundamental_freq, *current.T, harmonics, voltages, config, weights, min_tuning)
+    for _ in range(max_iter):
+        if standard:
+            trial_idx = np.clip(index[:, None, :] + offsets[None, :, :], 0, limits)
+            trial = np.stack(values(trial_idx), axis=-1)
+        else:
+            trial_log = np.clip(log_point[:, None, :] + step[:, None, :] * offsets[None, :, :],
+                                bounds[:, 0], bounds[:, 1])
+            trial = np.exp(trial_log)
+        flat = trial.reshape(-1, 3)
+        objective, size = evaluate(fundamental_freq, *flat.T, harmonics, voltages, config, weights, min_tuning)
+        seen.append(np.column_stack([flat, objective, size]))
+        objective = objective.reshape(len(starts), -1)
+        choice = np.argmin(objective, axis=1)
+        improved = objective[np.arange(len(starts)), choice] < best
+        rows = np.nonzero(improved)[0]
+        best[rows] = objective[rows, choice[rows]]
+        current[rows] = trial[rows, choice[rows]]
+        if standard:
+            index[rows] = trial_idx[rows, choice[rows]]
+            if not improved.any():
+                break
+        else:
+            log_point[rows] = trial_log[rows, choice[rows]]
+            step[~improved] /= 2
+            if np.all(step < 1e-3):
+                break
+    return current, best, np.concatenate(seen) if seen else np.empty((0, 5))
+
+def pareto_front(objective, size):
+    """Indices of points not beaten on both objective and size, ordered by size."""
+    order = np.lexsort((objective, size))
+    running_best = np.minimum.accumulate(objective[order])
+    keep = np.ones(len(order), dtype=bool)
+    keep[1:] = objective[order][1:] < running_best[:-1]
+    return order[keep]
+
+def optimise_filter(harmonics, voltages, fundamental_freq=50, config='series', ranges=None, standard=None,
+                    weights=None, points=30, starts=8, workers=None, min_tuning=MIN_TUNING):
+    """
+    Search the (C, L, R) space and return the best design and the Pareto set.
+    Returns a dict with 'best', 'pareto' (DataFrame), 'evaluations' and 'elapsed' (s).
+    """
+    started = time.perf_counter()
+    ranges = {**DEFAULT_RANGES, **(ranges or {})}
+    axes = candidate_axes(ranges, standard, points)
+    C, L, R, objective, size = coarse_search(axes, fundamental_freq, harmonics, voltages, config, weights, workers,
+                                             min_tuning=min_tuning)
+    if not np.isfinite(objective).any():
+        raise ValueError(f"No design in the search ranges is tuned at or above order {min_tuning:g}")
+
+    finite = np.isfinite(objective)
+    start_idx = np.argsort(np.where(finite, objective, np.inf))[:starts]
+    start_points = np.column_stack([C[start_idx], L[start_idx], R[start_idx]])
+    best_points, best_values, refined = refine(start_points, axes, fundamental_freq, harmonics, voltages,
+                                               config, weights, standard, min_tuning=min_tuning)
+
+    all_points = np.concatenate([np.column_stack([C, L, R, objective, size]), refined])
+    all_points = all_points[np.all(np.isfinite(all_points), axis=1)]
+    front = all_points[pareto_front(all_points[:, 3], all_points[:, 4])]
+
+    objective_name = 'Weighted Current (A)' if weights else 'Current THD (%)'
+    pareto = pd.DataFrame(front, columns=['C (F)', 'L (H)', 'R (Ohms)', objective_name, 'Size (kVA)'])
+    winner = int(np.argmin(best_values))
+    return {
+        'best': dict(zip(['C (F)', 'L (H)', 'R (Ohms)', objective_name], [*best_points[winner], best_values[winner]])),
+        'pareto': pareto,
+        'evaluations': len(C) + len(refined),
+        'elapsed': time.perf_counter() - started,
+    }
+
+# ---------------- CLI Mode ---------------- #
+
+def parse_weights(text):
+    # "5:1,7:0.5" -> {5: 1.0, 7: 0.5}
+    if not text:
+        return None
+    return {float(h): float(w) for h, w in (item.split(':') for item in text.split(','))}
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Optimise C, L and R to minimise current THD.")
+    parser.add_argument('spectrum', help="Spectrum CSV with Harmonic and Voltage columns")
+    parser.add_argument('--fundamental', type=float, default=50)
+    parser.add_argument('--config', default='series', choices=['series', 'shunt'])
+    parser.add_argument('--standard', choices=sorted(E_SERIES), help="Restrict to standard component values")
+    parser.add_argument('--weights', help="Weighted harmonic-current target, e.g. 5:1,7:1,11:0.5")
+    parser.add_argument('--C-range', nargs=2, type=float, default=DEFAULT_RANGES['C'])
+    parser.add_argument('--L-range', nargs=2, type=float, default=DEFAULT_RANGES['L'])
+    parser.add_argument('--R-range', nargs=2, type=float, default=DEFAULT_RANGES['R'])
+    parser.add_argument('--points', type=int, default=30, help="Coarse grid points per axis (continuous mode)")
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--min-tuning', type=float, default=MIN_TUNING,
+                        help="Lowest accepted L-C resonance in harmonic orders (default %(default)s)")
+    parser.add_argument('--out', default='filter_pareto.csv')
+    args = parser.parse_args(argv)
+
+    df_csv = pd.read_csv(args.spectrum)
+    harmonics = df_csv['Harmonic'].tolist()
+    voltages = df_csv['Voltage'].tolist()
+    ranges = {'C': tuple(args.C_range), 'L': tuple(args.L_range), 'R': tuple(args.R_range)}
+    try:
+        result = optimise_filter(harmonics, voltages, args.fundamental, args.config, ranges, args.standard,
+                                 parse_weights(args.weights), args.points, workers=args.workers,
+                                 min_tuning=args.min_tuning)
+    except ValueError as e:
+        parser.error(str(e))
+
+    result['pareto'].to_csv(args.out, index=False)
+    for name, value in result['best'].items():
+        print(f"{name}: {value:.6g}")
+    print(f"Pareto set ({len(result['pareto'])} designs) saved to {args.out}")
+    print(f"{result['evaluations']} evaluations in {result['elapsed']:.2f} s")
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,176 @@
+"""
+Adaptive frequency scan for the series/shunt harmonic calculator.
+Features:
+- Impedance and current-per-volt over a continuous frequency range
+- Coarse grid first, then refinement only around |Z| peaks/dips and phase crossings
+- Resonance frequency, type (series/parallel), |Z| and Q from the half-power bandwidth
+- Built on calculate_impedances_array from MaxHarmonicCurrent.py
+"""
+
+import numpy as np
+import pandas as pd
+
+from MaxHarmonicCurrent import calculate_impedances_array
+
+# ---------------- Impedance ---------------- #
+
+def network_impedance(freqs, C, L, R, config, fundamental_freq=50):
+    """
+    Complex impedance seen by the source at each frequency.
+    series: R, L and C in one branch. shunt: R, L and C each directly across the source.
+    Components switched out in calculate_impedances (C, L or R of 0) are left out here too.
+    """
+    harmonics = np.asarray(freqs, dtype=float) / fundamental_freq
+    X_C, X_L, R_val = calculate_impedances_array(fundamental_freq, harmonics, C, L, R)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        if config == 'shunt':
+            Y = np.zeros(X_L.shape, dtype=complex)
+            Y += np.where(R_val != 0, 1 / np.where(R_val != 0, R_val, 1), 0)
+            Y += np.where(X_L != 0, -1j / np.where(X_L != 0, X_L, 1), 0)
+            Y += np.where(np.isfinite(X_C), 1j / X_C, 0)
+            return np.where(Y != 0, 1 / np.where(Y != 0, Y, 1), np.inf)
+        return np.where(np.isfinite(X_C), R_val + 1j * (X_L - np.where(np.isfinite(X_C), X_C, 0)), np.inf)
+
+# ---------------- Adaptive Scan ---------------- #
+
+def _bisect(func, lo, hi, f_lo, tol):
+    # func changes sign between lo and hi; f_lo is func(lo)
+    while hi - lo > tol:
+        mid = 0.5 * (lo + hi)
+        f_mid = func(mid)
+        if np.sign(f_mid) == np.sign(f_lo):
+            lo, f_lo = mid, f_mid
+        else:
+            hi = mid
+    return 0.5 * (lo + hi)
+
+def _zoom(func, lo, hi, find_max, tol, points):
+    # Repeatedly sample the bracket and shrink it to the neighbours of the best point
+    while hi - lo > tol:
+        grid = np.linspace(lo, hi, points + 2)
+        values = func(grid)
+        i = int(np.argmax(values) if find_max else np.argmin(values))
+        lo, hi = grid[max(i - 1, 0)], grid[min(i + 1, len(grid) - 1)]
+    return 0.5 * (lo + hi)
+
+def frequency_scan(C, L, R, config, f_min=10.0, f_max=2500.0, fundamental_freq=50,
+                   coarse_points=200, resolution=0.01, refine_points=8):
+    """
+    Locate series and parallel resonances between f_min and f_max.
+
+    Starts from a log-spaced coarse grid, then refines around every local |Z| extremum
+    and every phase zero crossing until the bracket is narrower than resolution (Hz).
+    Returns a dict with the resonance table, the impedance curve (every evaluated point)
+    and the number of impedance evaluations used.
+    """
+    evaluated = {}
+
+    def impedance(f):
+        f = np.atleast_1d(np.asarray(f, dtype=float))
+        Z = network_impedance(f, C, L, R, config, fundamental_freq)
+        evaluated.update(zip(f.tolist(), Z.tolist()))
+        return Z
+
+    def magnitude(f):
+        return np.abs(impedance(f))
+
+    def phase(f):
+        return float(np.angle(impedance(f))[0])
+
+    grid = np.geomspace(f_min, f_max, coarse_points)
+    Z = impedance(grid)
+    mag = np.abs(Z)
+    ang = np.angle(Z)
+
+    candidates = []
+    # Phase zero crossings catch narrow resonances that fall between coarse points
+    for i in np.nonzero(np.sign(ang[:-1]) * np.sign(ang[1:]) < 0)[0]:
+        if abs(ang[i] - ang[i + 1]) < np.pi:
+            f0 = _bisect(phase, grid[i], grid[i + 1], ang[i], resolution)
+            candidates.append(f0)
+    # Local |Z| extrema (damped circuits may never cross zero phase)
+    for i in range(1, len(grid) - 1):
+        is_min = mag[i] <= mag[i - 1] and mag[i] <= mag[i + 1]
+        is_max = mag[i] >= mag[i - 1] and mag[i] >= mag[i + 1]
+        if (is_min or is_max) and np.isfinite(mag[i]) and not (mag[i] == mag[i - 1] == mag[i + 1]):
+            f0 = _zoom(magnitude, grid[i - 1], grid[i + 1], is_max, resolution, refine_points)
+            candidates.append(f0)
+
+    resonances = []
+    for f0 in sorted(candidates):
+        if resonances and f0 - resonances[-1]['Frequency (Hz)'] < 10 * resolution:
+            continue
+        Z0 = impedance(f0)[0]
+        # Series resonance is a |Z| dip, parallel resonance a |Z| peak
+        left, right = np.abs(impedance([f0 * 0.999, f0 * 1.001]))
+        kind = 'series' if abs(Z0) <= min(left, right) else 'parallel'
+        resonances.append({
+            'Frequency (Hz)': f0,
+            'Harmonic Order': f0 / fundamental_freq,
+            'Type': kind,
+            '|Z| (Ohm)': abs(Z0),
+            'Q': _quality_factor(magnitude, f0, abs(Z0), kind, f_min, f_max, resolution),
+        })
+
+    freqs = np.array(sorted(evaluated))
+    Z_curve = np.array([evaluated[f] for f in freqs])
+    curve = pd.DataFrame({
+        'Frequency (Hz)': freqs,
+        '|Z| (Ohm)': np.abs(Z_curve),
+        'Phase (deg)': np.angle(Z_curve, deg=True),
+        'Current per Volt (A/V)': 1 / np.abs(Z_curve),
+    })
+    table = pd.DataFrame(resonances, columns=['Frequency (Hz)', 'Harmonic Order', 'Type', '|Z| (Ohm)', 'Q'])
+    return {
+        'resonances': table,
+        'curve': curve,
+        'evaluations': len(evaluated),
+        'uniform_evaluations': int(np.ceil((f_max - f_min) / resolution)) + 1,
+    }
+
+def _quality_factor(magnitude, f0, Z0, kind, f_min, f_max, resolution):
+    # Q = f0 / half-power bandwidth, edges found by stepping out geometrically then bisecting
+    target = Z0 * np.sqrt(2) if kind == 'series' else Z0 / np.sqrt(2)
+
+    def beyond(f):
+        m = magnitude(f)[0]
+        return m - target if kind == 'series' else target - m
+
+    edges = []
+    for direction in (-1, 1):
+        step = max(f0 * 1e-4, resolution)
+        inner = f0
+        while True:
+            outer = f0 + direction * step
+            if outer <= f_min or outer >= f_max:
+                return np.nan
+            if beyond(outer) >= 0:
+                break
+            inner = outer
+            step *= 2
+        lo, hi = sorted((inner, outer))
+        f_lo = beyond(lo)
+        edges.append(_bisect(beyond, lo, hi, f_lo, resolution / 10))
+    bandwidth = edges[1] - edges[0]
+    return f0 / bandwidth if bandwidth > 0 else np.inf
+
+# ---------------- CLI Mode ---------------- #
+
+def scan_cli_mode():
+    print("=== Harmonic Calculator (Frequency Scan) ===")
+    fundamental_freq = float(input("Enter fundamental frequency (Hz): "))
+    C = float(input("Enter capacitance (F): "))
+    L = float(input("Enter inductance (H): "))
+    R = float(input("Enter resistance (Ohms): "))
+    config = input("Enter configuration (series/shunt): ").strip().lower()
+    f_min = float(input("Scan from (Hz): "))
+    f_max = float(input("Scan to (Hz): "))
+
+    result = frequency_scan(C, L, R, config, f_min, f_max, fundamental_freq)
+    result['curve'].to_csv('frequency_scan.csv', index=False)
+    print(result['resonances'].to_string(index=False))
+    print(f"Impedance curve saved to frequency_scan.csv")
+    print(f"Evaluations: {result['evaluations']} (uniform grid at the same resolution: {result['uniform_evaluations']})")
+
+if __name__ == "__main__":
+    scan_cli_mode()
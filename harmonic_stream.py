@@ -0,0 +1,151 @@
+"""
+Streaming waveform-to-spectrum pipeline for power-quality recordings.
+Features:
+- Memory-maps raw binary sample files or reads CSV recordings in chunks
+- Windowed FFT spectra (10-cycle windows by default) with bounded memory
+- Each window fed through process_data_array / calculate_thd_array
+- Time series of THD and per-harmonic magnitudes, written incrementally to CSV
+"""
+
+import argparse
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from MaxHarmonicCurrent import process_data_array, calculate_thd_array
+
+# ---------------- Sample Sources ---------------- #
+
+def iter_binary_blocks(path, channels=1, dtype='int16', block_samples=1 << 20, offset=0, scale=1.0):
+    """
+    Memory-map an interleaved raw sample file and yield (samples, channels) float blocks.
+    Only one block is ever converted to float at a time.
+    """
+    samples = np.memmap(path, dtype=dtype, mode='r', offset=offset)
+    samples = samples[:len(samples) - len(samples) % channels].reshape(-1, channels)
+    scale = np.broadcast_to(np.asarray(scale, dtype=float), (channels,))
+    for start in range(0, len(samples), block_samples):
+        yield samples[start:start + block_samples].astype(float) * scale
+
+def iter_csv_blocks(path, columns, block_samples=1 << 18, scale=1.0):
+    """Read the given sample columns of a CSV recording in chunks."""
+    scale = np.broadcast_to(np.asarray(scale, dtype=float), (len(columns),))
+    for chunk in pd.read_csv(path, usecols=columns, chunksize=block_samples):
+        yield chunk[columns].to_numpy(float) * scale
+
+# ---------------- Spectra ---------------- #
+
+def harmonic_bins(sample_rate, fundamental_freq=50, cycles=10, max_harmonic=50):
+    # Window length and FFT bin of each harmonic (bin spacing is fundamental_freq / cycles)
+    window = int(round(cycles * sample_rate / fundamental_freq))
+    harmonics = np.arange(1, max_harmonic + 1)
+    bins = np.round(harmonics * fundamental_freq * window / sample_rate).astype(int)
+    keep = bins <= window // 2
+    return window, harmonics[keep], bins[keep]
+
+def stream_spectra(blocks, sample_rate, fundamental_freq=50, cycles=10, max_harmonic=50):
+    """
+    Turn a stream of (samples, channels) blocks into harmonic RMS spectra.
+    Yields (start_times, harmonics, spectra) with spectra shaped (windows, channels, harmonics).
+    Samples left over at the end of a block are carried into the next one.
+    """
+    window, harmonics, bins = harmonic_bins(sample_rate, fundamental_freq, cycles, max_harmonic)
+    carry = None
+    consumed = 0
+    for block in blocks:
+        if carry is not None and len(carry):
+            block = np.concatenate([carry, block])
+        n_windows = len(block) // window
+        carry = block[n_windows * window:]
+        if n_windows == 0:
+            continue
+        frames = block[:n_windows * window].reshape(n_windows, window, -1)
+        spectrum = np.fft.rfft(frames, axis=1)[:, bins, :]
+        # RMS of a sine of amplitude A is A / sqrt(2) = |X| * sqrt(2) / N
+        rms = np.abs(spectrum) * (np.sqrt(2) / window)
+        start_times = (consumed + np.arange(n_windows) * window) / sample_rate
+        consumed += n_windows * window
+        yield start_times, harmonics, np.transpose(rms, (0, 2, 1))
+
+# ---------------- THD Time Series ---------------- #
+
+def stream_thd(blocks, sample_rate, fundamental_freq=50, cycles=10, max_harmonic=50,
+               current_channel=None, C=None, L=None, R=None, config='series'):
+    """
+    Yield one DataFrame per block of windows with the voltage THD, the measured current
+    THD (if a current channel is given), the filter current THD from process_data_array
+    (if C, L and R are given) and the per-harmonic magnitudes.
+    Channel 0 is the voltage.
+    """
+    for start_times, harmonics, spectra in stream_spectra(blocks, sample_rate, fundamental_freq, cycles, max_harmonic):
+        voltages = spectra[:, 0, :]
+        columns = {'Time (s)': start_times}
+        if C is not None:
+            result = process_data_array(fundamental_freq, C, L, R, harmonics, voltages, config)
+            columns['Voltage THD (%)'] = result['voltage_thd']
+            columns['Filter Current THD (%)'] = result['current_thd']
+        else:
+            columns['Voltage THD (%)'] = calculate_thd_array(voltages)
+        if current_channel is not None:
+            currents = spectra[:, current_channel, :]
+            columns['Current THD (%)'] = calculate_thd_array(currents)
+        for i, h in enumerate(harmonics):
+            columns[f'V_h{h} (V)'] = voltages[:, i]
+        if current_channel is not None:
+            for i, h in enumerate(harmonics):
+                columns[f'I_h{h} (A)'] = currents[:, i]
+        yield pd.DataFrame(columns)
+
+def waveform_thd(blocks, sample_rate, out_path=None, **kwargs):
+    """
+    Run stream_thd over a whole recording. With out_path the time series is appended to
+    a CSV block by block and only the window count is kept; otherwise a DataFrame is returned.
+    """
+    if out_path is None:
+        frames = list(stream_thd(blocks, sample_rate, **kwargs))
+        return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+    windows = 0
+    for i, frame in enumerate(stream_thd(blocks, sample_rate, **kwargs)):
+        frame.to_csv(out_path, mode='w' if i == 0 else 'a', header=(i == 0), index=False)
+        windows += len(frame)
+    return windows
+
+# ---------------- CLI Mode ---------------- #
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="THD time series from a sampled voltage/current recording.")
+    parser.add_argument('recording', help="Raw interleaved sample file, or CSV with --columns")
+    parser.add_argument('--rate', type=float, required=True, help="Sample rate (Hz)")
+    parser.add_argument('--fundamental', type=float, default=50, help="Fundamental frequency (Hz)")
+    parser.add_argument('--cycles', type=int, default=10, help="Cycles per FFT window")
+    parser.add_argument('--max-harmonic', type=int, default=50)
+    parser.add_argument('--channels', type=int, default=1, help="Interleaved channels in a raw file")
+    parser.add_argument('--dtype', default='int16', help="Sample type of a raw file")
+    parser.add_argument('--offset', type=int, default=0, help="Header bytes to skip in a raw file")
+    parser.add_argument('--columns', nargs='+', help="CSV sample columns, voltage first")
+    parser.add_argument('--scale', type=float, nargs='+', default=[1.0], help="Scale to volts/amps per channel")
+    parser.add_argument('--current-channel', type=int, help="Channel holding the current, if any")
+    parser.add_argument('--filter', nargs=3, type=float, metavar=('C', 'L', 'R'), help="Also run the filter calculation")
+    parser.add_argument('--config', default='series', choices=['series', 'shunt'])
+    parser.add_argument('--out', default='thd_timeseries.csv')
+    args = parser.parse_args(argv)
+
+    if args.columns:
+        blocks = iter_csv_blocks(args.recording, args.columns, scale=args.scale)
+    else:
+        blocks = iter_binary_blocks(args.recording, args.channels, args.dtype, offset=args.offset, scale=args.scale)
+    C, L, R = args.filter if args.filter else (None, None, None)
+
+    started = time.perf_counter()
+    windows = waveform_thd(blocks, args.rate, args.out, fundamental_freq=args.fundamental, cycles=args.cycles,
+                           max_harmonic=args.max_harmonic, current_channel=args.current_channel,
+                           C=C, L=L, R=R, config=args.config)
+    elapsed = time.perf_counter() - started
+    duration = windows * args.cycles / args.fundamental
+    print(f"{windows} windows ({duration:.1f} s of recording) written to {args.out}")
+    print(f"Processed in {elapsed:.2f} s ({duration / max(elapsed, 1e-9):.0f}x real time)")
+
+if __name__ == "__main__":
+    sys.exit(main())
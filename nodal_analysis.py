@@ -0,0 +1,194 @@
+"""
+Small modified-nodal-analysis (MNA) engine for harmonic filter circuits.
+Features:
+- Netlist of R, L, C elements plus voltage (V) and current (I) sources
+- Admittance matrices for every frequency assembled as one stacked array
+- Batched linear solve over all frequencies in a single call
+- Netlists for the existing series/shunt and C-type circuits, and for
+  single-tuned, 2nd-order high-pass and double-tuned filters
+
+A netlist is a list of (name, kind, node_a, node_b, value) tuples. Node 0 (or '0',
+'gnd') is ground. Source values may be scalars or one value per frequency; a voltage
+source drives node_a positive, a current source pushes current from node_a to node_b.
+"""
+
+import numpy as np
+import pandas as pd
+
+GROUND = (0, '0', 'gnd')
+
+# ---------------- Assembly and Solve ---------------- #
+
+def _admittance(kind, value, omega):
+    if kind in ('R', 'L') and value == 0:
+        # A zero R or L is a short with no admittance; the netlist builders merge its nodes instead
+        raise ValueError(f"Zero-valued {kind} element: short it by merging its nodes")
+    if kind == 'R':
+        return np.full(omega.shape, 1 / value, dtype=complex)
+    if kind == 'L':
+        return 1 / (1j * omega * value)
+    if kind == 'C':
+        return 1j * omega * value
+    raise ValueError(f"Unknown element kind: {kind}")
+
+def solve_netlist(netlist, freqs):
+    """
+    Solve the netlist at every frequency in freqs (Hz) at once.
+
+    Returns a dict with 'freqs', 'nodes' (node -> complex voltage array) and 'elements'
+    (element name -> {'V': voltage from node_a to node_b, 'I': current from node_a to node_b}),
+    every array having one entry per frequency.
+    """
+    freqs = np.atleast_1d(np.asarray(freqs, dtype=float))
+    omega = 2 * np.pi * freqs
+    n_f = len(freqs)
+
+    nodes = []
+    for _, _, a, b, _ in netlist:
+        for node in (a, b):
+            if node not in GROUND and node not in nodes:
+                nodes.append(node)
+    index = {node: i for i, node in enumerate(nodes)}
+    sources = [e for e in netlist if e[1] == 'V']
+    size = len(nodes) + len(sources)
+
+    A = np.zeros((n_f, size, size), dtype=complex)
+    rhs = np.zeros((n_f, size), dtype=complex)
+    admittances = {}
+    for name, kind, a, b, value in netlist:
+        ia, ib = index.get(a), index.get(b)
+        if kind in ('R', 'L', 'C'):
+            y = _admittance(kind, value, omega)
+            admittances[name] = y
+            if ia is not None:
+                A[:, ia, ia] += y
+            if ib is not None:
+                A[:, ib, ib] += y
+            if ia is not None and ib is not None:
+                A[:, ia, ib] -= y
+                A[:, ib, ia] -= y
+        elif kind == 'I':
+            current = np.broadcast_to(np.asarray(value, dtype=complex), (n_f,))
+            if ia is not None:
+                rhs[:, ia] -= current
+            if ib is not None:
+                rhs[:, ib] += current
+        elif kind != 'V':
+            raise ValueError(f"Unknown element kind: {kind}")
+    for k, (name, _, a, b, value) in enumerate(sources):
+        row = len(nodes) + k
+        for node, sign in ((a, 1), (b, -1)):
+            if node not in GROUND:
+                A[:, index[node], row] += sign
+                A[:, row, index[node]] += sign
+        rhs[:, row] = np.broadcast_to(np.asarray(value, dtype=complex), (n_f,))
+
+    x = np.linalg.solve(A, rhs[..., np.newaxis])[..., 0]
+
+    def node_voltage(node):
+        return np.zeros(n_f, dtype=complex) if node in GROUND else x[:, index[node]]
+
+    elements = {}
+    source_row = len(nodes)
+    for name, kind, a, b, value in netlist:
+        V = node_voltage(a) - node_voltage(b)
+        if kind == 'V':
+            # The MNA unknown is the current from node_a to node_b through the source
+            I = x[:, source_row]
+            source_row += 1
+        elif kind == 'I':
+            I = np.broadcast_to(np.asarray(value, dtype=complex), (n_f,))
+        else:
+            I = V * admittances[name]
+        elements[name] = {'V': V, 'I': I}
+    return {'freqs': freqs, 'nodes': {node: x[:, i] for node, i in index.items()}, 'elements': elements}
+
+# ---------------- Netlists ---------------- #
+
+def _require_nonzero(**values):
+    # For builders whose results refer to every element, a shorted R or L cannot be left out
+    for name, value in values.items():
+        if value == 0:
+            raise ValueError(f"{name} must be non-zero in this circuit")
+
+def series_rlc_netlist(C, L, R, V=1.0):
+    """
+    Series configuration of MaxHarmonicCurrent.py: R, L and C in one branch across the source.
+    Zero R or L is a short and is left out of the chain, as in calculate_impedances_array;
+    C must be positive (the array path treats C = 0 as an open branch carrying no current).
+    """
+    if not C > 0:
+        raise ValueError("Series branch needs C > 0")
+    netlist = [('Vs', 'V', 'in', 0, V)]
+    node = 'in'
+    for name, value in (('R', R), ('L', L)):
+        if value != 0:
+            netlist.append((name, name, node, name.lower(), value))
+            node = name.lower()
+    netlist.append(('C', 'C', node, 0, C))
+    return netlist
+
+def shunt_rlc_netlist(C, L, R, V=1.0):
+    """Shunt configuration of MaxHarmonicCurrent.py: R, L and C each across the source (zero values left out)."""
+    netlist = [('Vs', 'V', 'in', 0, V)]
+    for name, value in (('R', R), ('L', L), ('C', C)):
+        if value > 0:
+            netlist.append((name, name, 'in', 0, value))
+    return netlist
+
+def c_type_netlist(L, C1, C2, R, V=1.0):
+    """C-type filter of Harmonic.py: L in series with C1 || (R + C2)."""
+    _require_nonzero(L=L, R=R)
+    return [('Vs', 'V', 'in', 0, V), ('L', 'L', 'in', 'n', L), ('C1', 'C', 'n', 0, C1),
+            ('R', 'R', 'n', 'm', R), ('C2', 'C', 'm', 0, C2)]
+
+def single_tuned_netlist(C, L, R, V=1.0):
+    """Single-tuned filter: series R-L-C branch from the bus to ground."""
+    return series_rlc_netlist(C, L, R, V)
+
+def high_pass_netlist(C, L, R, V=1.0):
+    """2nd-order high-pass filter: C in series with L || R."""
+    _require_nonzero(L=L, R=R)
+    return [('Vs', 'V', 'in', 0, V), ('C', 'C', 'in', 'n', C), ('L', 'L', 'n', 0, L), ('R', 'R', 'n', 0, R)]
+
+def double_tuned_netlist(C1, L1, C2, L2, R, V=1.0):
+    """Double-tuned filter: series C1-L1 branch feeding a parallel C2 || L2 || R tank."""
+    _require_nonzero(L1=L1, L2=L2, R=R)
+    return [('Vs', 'V', 'in', 0, V), ('C1', 'C', 'in', 'a', C1), ('L1', 'L', 'a', 'n', L1),
+            ('C2', 'C', 'n', 0, C2), ('L2', 'L', 'n', 0, L2), ('R', 'R', 'n', 0, R)]
+
+# ---------------- Existing Calculators on MNA ---------------- #
+
+def process_data_mna(fundamental_freq, C, L, R, harmonics, voltages, config):
+    """Series/shunt currents of process_data_array for one (C, L, R) set, solved by MNA."""
+    harmonics = np.asarray(harmonics, dtype=float)
+    V = np.asarray(voltages, dtype=float)
+    freqs = harmonics * fundamental_freq
+    if C > 0:
+        # The source current is the branch current, whichever of R and L are shorted out
+        series = np.abs(solve_netlist(series_rlc_netlist(C, L, R, V), freqs)['elements']['Vs']['I'])
+    else:
+        series = np.zeros(len(freqs))
+    if config == 'shunt':
+        solved = solve_netlist(shunt_rlc_netlist(C, L, R, V), freqs)
+        branch = lambda name: np.abs(solved['elements'][name]['I']) if name in solved['elements'] else np.zeros(len(freqs))
+        I_C, I_L, I_R = branch('C'), branch('L'), branch('R')
+    else:
+        I_C = I_L = I_R = series
+    return {'series_current': series, 'I_C': I_C, 'I_L': I_L, 'I_R': I_R}
+
+def c_type_filter_mna(harmonics, V_harmonics, L, C1, C2, R, f_base=50):
+    """Same table as Harmonic.c_type_filter_voltages, solved by MNA."""
+    harmonics = np.asarray(harmonics)
+    V = np.asarray(V_harmonics)
+    solved = solve_netlist(c_type_netlist(L, C1, C2, R, V), harmonics * f_base)
+    e = solved['elements']
+    phasors = {
+        'I_source': e['L']['I'], 'V_L': e['L']['V'], 'V_C1': e['C1']['V'], 'V_R': e['R']['V'],
+        'V_C2': e['C2']['V'], 'I_C1': e['C1']['I'], 'I_branch': e['R']['I'],
+    }
+    columns = {'Harmonic': harmonics, 'Frequency (Hz)': harmonics * f_base, 'V_source_mag': np.abs(V)}
+    for name, value in phasors.items():
+        columns[f'{name}_mag'] = np.abs(value)
+        columns[f'{name}_angle'] = np.angle(value, deg=True)
+    return pd.DataFrame(columns)
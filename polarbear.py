@@ -2,54 +2,115 @@ import pygame
 import sys
 import math
 
-# Initialize Pygame
-pygame.init()
+from asset_manager import AssetManager
+from audio_spectrum import live_spectrum
+from beat_grid import BeatClock
+from dirty_renderer import DirtyRenderer
+from engine import Engine, MusicClock
+from sprite_cache import SpriteCache
 
 # Screen settings
 WIDTH, HEIGHT = 800, 600
-screen = pygame.display.set_mode((WIDTH, HEIGHT))
-pygame.display.set_caption("Dancing Polar Bear")
+FPS = 60
 
 # Colors
 WHITE = (255, 255, 255)
 
-# Clock
-clock = pygame.time.Clock()
+# Assets, relative to the repository
+BEAR_IMAGE = "Polar_Bear.png"
+MUSIC = "baby-shark-122769.mp3"
 
-# Load polar bear image (replace with your file path)
-bear_img = pygame.image.load(r"C:\Users\scott\MyNew SC Folder\Polar_Bear.png").convert_alpha()
-bear_img = pygame.transform.scale(bear_img, (150, 150))  # Resize
 
-# Load background music
-pygame.mixer.music.load(r"C:\Users\scott\MyNew SC Folder\baby-shark-122769.mp3")  # Replace with your music file
-pygame.mixer.music.play(-1)  # Loop indefinitely
+class PolarBearScene:
+    def __init__(self, screen, image_path=BEAR_IMAGE, music_path=MUSIC, assets=None, spectrum=None):
+        self.screen = screen
+        self.assets = assets or AssetManager()
+        width, height = screen.get_size()
 
-# Bear position
-bear_x, bear_y = WIDTH // 2, HEIGHT // 2
-angle = 0
+        # Load polar bear image, converted and resized once
+        bear_img = self.assets.image(image_path, (150, 150))
 
-# Main loop
-while True:
-    for event in pygame.event.get():
-        if event.type == pygame.QUIT:
-            pygame.quit()
-            sys.exit()
+        # Pre-render the dance poses (-20 to 20 degrees in half-degree steps)
+        self.sprites = SpriteCache(bear_img, angle_step=0.5)
+        self.sprites.prerender(angles=[step * 0.5 - 20 for step in range(81)])
 
-    # Clear screen
-    screen.fill(WHITE)
+        # Beat grid cached beside the music by beat_grid.py
+        music_files = self.assets.music_candidates(music_path)
+        self.beat_clock = BeatClock.for_audio(music_files[0] if music_files else music_path)
 
-    # Dancing motion synced to beat
-    angle += 0.05
-    offset_x = math.sin(angle) * 50
-    offset_y = math.cos(angle) * 20
+        # Renderer that only redraws changed regions (F3 shows frame times)
+        self.renderer = DirtyRenderer(screen, WHITE, fps=FPS)
 
-    # Rotate bear image for dance effect
-    rotated_bear = pygame.transform.rotate(bear_img, math.sin(angle) * 20)
+        # Bear position
+        self.bear_x, self.bear_y = width // 2, height // 2
+        self.angle = 0
+        self.previous_angle = 0
 
-    # Draw bear
-    rect = rotated_bear.get_rect(center=(bear_x + offset_x, bear_y + offset_y))
-    screen.blit(rotated_bear, rect)
+        # Live audio analysis (audio_spectrum.SpectrumAnalyser), if any: the bass widens the sway
+        self.spectrum = spectrum
+        self.audio = spectrum.result() if spectrum else None
+        self.sway = 1.0
 
-    # Update display
-    pygame.display.flip()
-    clock.tick(60)
+    def handle_event(self, event):
+        if event.type == pygame.KEYDOWN and event.key == pygame.K_F3:
+            self.renderer.toggle_overlay()
+
+    def update(self, t):
+        # Dancing motion synced to beat: one sway every four beats of the music (t in seconds)
+        self.previous_angle = self.angle
+        self.angle = self.beat_clock.position(t) * math.pi / 2
+        if self.spectrum is not None and self.spectrum.read(self.audio):
+            self.sway = 0.7 + 0.6 * float(self.audio.bands[:2].max())
+
+    def draw(self, alpha=1.0):
+        # Clear last frame's bear
+        self.renderer.begin_frame()
+
+        # Pose between the last two updates
+        angle = self.previous_angle + (self.angle - self.previous_angle) * alpha
+        offset_x = math.sin(angle) * 50 * self.sway
+        offset_y = math.cos(angle) * 20
+
+        # Rotated bear for dance effect, from the pre-rendered poses
+        rotated_bear = self.sprites.get(math.sin(angle) * 20)
+
+        # Draw bear
+        rect = rotated_bear.get_rect(center=(self.bear_x + offset_x, self.bear_y + offset_y))
+        self.renderer.blit(rotated_bear, rect)
+
+        # Update the changed regions of the display
+        self.renderer.end_frame()
+
+    def report(self):
+        return self.sprites.report()
+
+
+def main():
+    # Initialize Pygame
+    pygame.init()
+    screen = pygame.display.set_mode((WIDTH, HEIGHT))
+    pygame.display.set_caption("Dancing Polar Bear")
+
+    assets = AssetManager()
+
+    # Load background music, analysed live as it plays
+    music_path = assets.load_music(MUSIC)
+    clock = MusicClock()
+    spectrum = live_spectrum(music_path, clock) if music_path else None
+
+    scene = PolarBearScene(screen, assets=assets, spectrum=spectrum)
+    if music_path:
+        pygame.mixer.music.play(-1)  # Loop indefinitely
+
+    # Main loop: fixed-step updates on the music clock, drawn at up to FPS
+    engine = Engine(scene, fps=FPS, time_source=clock)
+    print(engine.run())
+    print(scene.report())
+    if spectrum:
+        print(spectrum.report())
+    pygame.quit()
+    sys.exit()
+
+
+if __name__ == "__main__":
+    main()
@@ -3,113 +3,189 @@ import sys
 import math
 import random
 
-# Initialize pygame
-pygame.init()
-
-# Initialize mixer for music
-pygame.mixer.init(frequency=44100, size=-16, channels=2, buffer=512)
-
-# Set up display
+from asset_manager import AssetManager
+from audio_spectrum import live_spectrum
+from beat_grid import BeatClock
+from dirty_renderer import DirtyRenderer, LightCache
+from engine import Engine, MusicClock
+from particles import LightField
+from sprite_cache import SpriteCache
+
+# Display settings
 WIDTH, HEIGHT = 800, 600
-window = pygame.display.set_mode((WIDTH, HEIGHT))
-pygame.display.set_caption("Dancing Capybara Disco")
-
-# Load the PARTY TIME image (generated earlier)
-image_path = r"C:\Users\scott\capybara.png"  # Save the generated image here
-capybara_img = pygame.image.load(image_path)
-capybara_img = pygame.transform.scale(capybara_img, (400, 400))
-
-# Load Baby Shark music
-music_path = r"C:\Users\scott\MyNew SC Folder\baby-shark-122769.wav"  # Ensure this file exists
-try:
-    pygame.mixer.music.load(music_path)
-    pygame.mixer.music.play(-1)  # Loop indefinitely
-except pygame.error as e:
-    print(f"Error loading music: {e}")
-    print("Ensure the file exists and is in WAV format.")
-
-# Clock for controlling frame rate
-clock = pygame.time.Clock()
-
-# Animation parameters
-angle = 0
-scale_factor = 1.0
-scale_direction = 1
-
-# Beat sync parameters
-beat_interval = 60.0 / 115.0  # Baby Shark ~115 BPM
-last_beat_time = pygame.time.get_ticks() / 1000.0
-bounce_amplitude = 50
-y_center = HEIGHT // 2
-
-# Disco lights parameters
-lights = [(random.randint(0, WIDTH), random.randint(0, HEIGHT), random.choice([(255,0,0),(0,255,0),(0,0,255),(255,255,0),(255,0,255),(0,255,255)])) for _ in range(10)]
-
-# Main loop
-running = True
-while running:
-    current_time = pygame.time.get_ticks() / 1000.0
-
-    for event in pygame.event.get():
-        if event.type == pygame.QUIT:
-            running = False
-
-    # Rotation
-    angle += 2
-    if angle >= 360:
-        angle = 0
-
-    # Scaling
-    scale_factor += scale_direction * 0.02
-    if scale_factor > 1.3 or scale_factor < 0.7:
-        scale_direction *= -1
-
-    # Beat-synced bounce
-    if current_time - last_beat_time >= beat_interval:
-        last_beat_time = current_time
-        bounce_amplitude = random.randint(40, 60)
-
-    phase = (current_time - last_beat_time) / beat_interval
-    y_offset = math.sin(phase * math.pi) * bounce_amplitude
-    y_pos = y_center + y_offset
-
-    # Transform image
-    rotated_img = pygame.transform.rotate(capybara_img, angle)
-    new_width = int(rotated_img.get_width() * scale_factor)
-    new_height = int(rotated_img.get_height() * scale_factor)
-    scaled_img = pygame.transform.scale(rotated_img, (new_width, new_height))
-
-    # Disco lights animation
-    window.fill((0, 0, 0))
-    for i in range(len(lights)):
-        x, y, color = lights[i]
-        pygame.draw.circle(window, color, (x, y), random.randint(30, 80))
-        # Randomize positions and colors for flashing effect
-        lights[i] = (random.randint(0, WIDTH), random.randint(0, HEIGHT), random.choice([(255,0,0),(0,255,0),(0,0,255),(255,255,0),(255,0,255),(0,255,255)]))
-
-    # Draw image
-    x_pos = WIDTH // 2 - scaled_img.get_width() // 2
-    window.blit(scaled_img, (x_pos, y_pos - scaled_img.get_height() // 2))
-
-    pygame.display.flip()
-    clock.tick(30)
-
-pygame.quit()
-sys.exit() pygame.display.flip()
-    clock.tick(30)
-
-pygame.quit()
-sys.exit() pygame.display.flip()
-    clock.tick(30)
-
-pygame.quit()
-sys.exit() pygame.display.flip()
-    clock.tick(30)
-
-pygame.quit()
-sys.exit()me rate
-    clock.tick(30)
-
-# Quit pygame
-pygame.quit()
-sys.exit()
\ No newline at end of file
+FPS = 30
+
+# Dance poses: 30 pose steps per second (formerly one per frame at 30 FPS), each turning
+# 2 degrees and scaling by 0.02 between 0.7 and 1.3. Angle and scale both follow the whole
+# step count, so one spin's 180 poses are all the sprite cache ever sees.
+POSE_RATE = 30.0
+SPIN_STEP = 2
+SCALE_STEP = 0.02
+SCALE_RANGE = (0.7, 1.3)
+
+# Assets, relative to the repository
+IMAGE = "capybara.png"  # Save the generated PARTY TIME image here
+PLACEHOLDER_IMAGE = "Polar_Bear.png"  # Shown until capybara.png exists
+MUSIC = "baby-shark-122769.mp3"
+
+LIGHT_COLORS = [(255,0,0),(0,255,0),(0,0,255),(255,255,0),(255,0,255),(0,255,255)]
+LIGHTS = 10
+# Up to this many lights are drawn as pre-rendered glow discs, which only dirty the discs
+# themselves; larger fields go through the light field's blur and dirty its lit tiles
+DISC_LIGHTS = 64
+LIGHT_LEVELS = 8
+
+
+class CapybaraScene:
+    def __init__(self, screen, image_path=IMAGE, music_path=MUSIC, rng=None, assets=None, lights=LIGHTS,
+                 spectrum=None):
+        self.screen = screen
+        self.assets = assets or AssetManager()
+        self.width, self.height = screen.get_size()
+        self.rng = rng or random.Random()
+
+        # Load the PARTY TIME image (generated earlier), converted and resized once
+        capybara_img = self.assets.image(image_path, (400, 400), fallback=PLACEHOLDER_IMAGE)
+
+        # Rotated/scaled poses, cached (2 degree and 0.05 scale steps) instead of transformed every frame
+        self.sprites = SpriteCache(capybara_img, angle_step=2, scale_step=0.05, budget_mb=256)
+
+        # Animation parameters
+        self.pose_step = 0.0
+
+        # Beat sync parameters
+        # Beat grid cached beside the music by beat_grid.py (falls back to ~115 BPM)
+        music_files = self.assets.music_candidates(music_path)
+        self.beat_clock = BeatClock.for_audio(music_files[0] if music_files else music_path, bpm=115.0)
+        self.last_beat = -1
+        self.bounce_amplitude = 50
+        self.y_center = self.height // 2
+        self.y_pos = self.y_center
+        # Pose step and height at the previous update, for interpolated drawing
+        self.previous = (self.pose_step, self.y_pos)
+
+        # Renderer that only redraws changed regions (F3 shows frame times)
+        self.renderer = DirtyRenderer(screen, (0, 0, 0), fps=FPS)
+
+        # Disco lights: a NumPy light field re-randomised every frame for the flashing effect,
+        # dimmed as the count grows so thousands of lights do not wash out to white
+        self.lights = LightField((self.width, self.height), lights, LIGHT_COLORS, radius=(30, 80),
+                                 brightness=min(1.0, (LIGHTS / max(lights, 1)) ** 0.5), flash=True,
+                                 seed=self.rng.getrandbits(32))
+        self.light_brightness = self.lights.brightness
+        self.light_discs = None
+        if lights <= DISC_LIGHTS:
+            self.light_discs = LightCache(radius_step=10, glow=True)
+            self.light_discs.prerender(self.lights.disc_colours(LIGHT_LEVELS), range(30, 81, 10))
+        self.last_t = None
+
+        # Live audio analysis (audio_spectrum.SpectrumAnalyser), if any: the bass drives the
+        # bounce, the level the lights and the distortion metric the spin
+        self.spectrum = spectrum
+        self.audio = spectrum.result() if spectrum else None
+        self.bass = self.level = 1.0
+        self.distortion = 0.0
+
+    def pose(self, step):
+        """Angle and scale at a pose step, snapped to a whole step so poses repeat every spin."""
+        k = round(step)
+        levels = round((SCALE_RANGE[1] - SCALE_RANGE[0]) / SCALE_STEP)
+        # Triangle wave over the scale range, starting at 1.0 on the way up
+        level = (k + round((1.0 - SCALE_RANGE[0]) / SCALE_STEP)) % (2 * levels)
+        level = level if level <= levels else 2 * levels - level
+        return (k * SPIN_STEP) % 360, SCALE_RANGE[0] + level * SCALE_STEP
+
+    def handle_event(self, event):
+        if event.type == pygame.KEYDOWN and event.key == pygame.K_F3:
+            self.renderer.toggle_overlay()
+
+    def update(self, t):
+        dt = 0.0 if self.last_t is None else max(0.0, t - self.last_t)
+        self.last_t = t
+        self.previous = (self.pose_step, self.y_pos)
+
+        if self.spectrum is not None and self.spectrum.read(self.audio):
+            self.bass = float(self.audio.bands[:2].max())
+            self.level = self.audio.level
+            self.distortion = min(self.audio.thd, 100.0) / 100
+
+        # Rotation and scaling
+        self.pose_step += POSE_RATE * (1 + self.distortion) * dt
+
+        # Beat-synced bounce (t is the music playback time in seconds)
+        beat, phase = self.beat_clock.beat_and_phase(t)
+        if beat != self.last_beat:
+            self.last_beat = beat
+            self.bounce_amplitude = self.rng.randint(40, 60)
+
+        y_offset = math.sin(phase * math.pi) * self.bounce_amplitude * (0.6 + 0.4 * self.bass)
+        self.y_pos = self.y_center + y_offset
+
+        # Disco lights
+        self.lights.brightness = self.light_brightness * (0.3 + 0.7 * self.level)
+        self.lights.update(dt)
+
+    def draw(self, alpha=1.0):
+        # Pose between the last two updates
+        current = (self.pose_step, self.y_pos)
+        step, y_pos = (a + (b - a) * alpha for a, b in zip(self.previous, current))
+        angle, scale = self.pose(step)
+
+        # Transformed image from the sprite cache
+        scaled_img = self.sprites.get(angle, scale)
+
+        # Disco lights animation: a few lights as cached glow discs, many composited into one
+        # layer of which only the lit regions are copied and updated
+        self.renderer.begin_frame()
+        if self.light_discs is not None:
+            for colour, centre, radius in self.lights.discs(LIGHT_LEVELS):
+                self.light_discs.blit(self.renderer, colour, centre, radius)
+        else:
+            lights = self.lights.render()
+            for rect in self.lights.lit_rects():
+                self.renderer.blit(lights, rect, rect)
+
+        # Draw image
+        x_pos = self.width // 2 - scaled_img.get_width() // 2
+        self.renderer.blit(scaled_img, (x_pos, y_pos - scaled_img.get_height() // 2))
+
+        self.renderer.end_frame()
+
+    def report(self):
+        return self.sprites.report()
+
+
+def main():
+    # Initialize pygame
+    pygame.init()
+
+    # Initialize mixer for music
+    pygame.mixer.init(frequency=44100, size=-16, channels=2, buffer=512)
+
+    # Set up display
+    window = pygame.display.set_mode((WIDTH, HEIGHT))
+    pygame.display.set_caption("Dancing Capybara Disco")
+
+    assets = AssetManager()
+
+    # Load Baby Shark music (other formats of the track are tried if one fails), analysed live as it plays
+    music_path = assets.load_music(MUSIC)
+    clock = MusicClock()
+    spectrum = live_spectrum(music_path, clock) if music_path else None
+
+    scene = CapybaraScene(window, assets=assets, spectrum=spectrum)
+    if music_path:
+        pygame.mixer.music.play(-1)  # Loop indefinitely
+
+    # Main loop: fixed-step updates on the music clock (or wall clock without music), drawn at up to FPS
+    engine = Engine(scene, fps=FPS, time_source=clock)
+    print(engine.run())
+    print(scene.report())
+    if spectrum:
+        print(spectrum.report())
+    pygame.quit()
+    sys.exit()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+Rotation/scale sprite cache for the dancing animations.
+Features:
+- Rotation angles and scale factors snapped to fixed steps, so repeated poses reuse one surface
+- Lazily rendered surfaces kept in LRU order under a memory budget, or pre-rendered up front
+- Hit, miss and eviction counts with the hit rate, for tuning the steps and the budget
+"""
+
+from collections import OrderedDict
+
+import pygame
+
+
+class SpriteCache:
+    def __init__(self, image, angle_step=2.0, scale_step=0.02, budget_mb=128, smooth=False):
+        """
+        image is the untransformed sprite. Angles snap to multiples of angle_step degrees and
+        scales to multiples of scale_step; budget_mb caps the pixel memory of cached surfaces.
+        smooth uses rotozoom/smoothscale instead of the faster nearest-neighbour transforms.
+        """
+        self.image = image
+        self.angle_step = angle_step
+        self.scale_step = scale_step
+        self.budget = int(budget_mb * 1024 * 1024)
+        self.smooth = smooth
+        self.surfaces = OrderedDict()
+        self.bytes = 0
+        self.hits = self.misses = self.evictions = 0
+
+    # ---------------- Lookup ---------------- #
+
+    def key(self, angle, scale=1.0):
+        steps = round(360 / self.angle_step)
+        angle_index = round(angle / self.angle_step) % steps
+        scale_index = max(1, round(scale / self.scale_step))
+        return angle_index, scale_index
+
+    def render(self, key):
+        angle = key[0] * self.angle_step
+        scale = key[1] * self.scale_step
+        if self.smooth:
+            return pygame.transform.rotozoom(self.image, angle, scale)
+        surface = pygame.transform.rotate(self.image, angle) if angle else self.image
+        if abs(scale - 1.0) > 1e-9:
+            size = (max(1, int(surface.get_width() * scale)), max(1, int(surface.get_height() * scale)))
+            surface = pygame.transform.scale(surface, size)
+        return surface
+
+    def get(self, angle, scale=1.0):
+        """Surface for the pose nearest to (angle, scale), rendering and caching it on a miss."""
+        key = self.key(angle, scale)
+        surface = self.surfaces.get(key)
+        if surface is not None:
+            self.hits += 1
+            self.surfaces.move_to_end(key)
+            return surface
+        self.misses += 1
+        surface = self.render(key)
+        self._store(key, surface)
+        return surface
+
+    def _store(self, key, surface):
+        size = surface.get_width() * surface.get_height() * surface.get_bytesize()
+        if size > self.budget:
+            # Larger than the whole budget: not cached, and nothing else is evicted for it
+            return
+        while self.surfaces and self.bytes + size > self.budget:
+            _, old = self.surfaces.popitem(last=False)
+            self.bytes -= old.get_width() * old.get_height() * old.get_bytesize()
+            self.evictions += 1
+        self.surfaces[key] = surface
+        self.bytes += size
+
+    # ---------------- Pre-rendering ---------------- #
+
+    def prerender(self, angles=None, scales=(1.0,)):
+        """
+        Render poses up front (default: every angle step at the given scales), stopping
+        once the budget is full. Returns the number of surfaces cached.
+        """
+        if angles is None:
+            angles = [i * self.angle_step for i in range(round(360 / self.angle_step))]
+        for scale in scales:
+            for angle in angles:
+                key = self.key(angle, scale)
+                if key in self.surfaces:
+                    continue
+                surface = self.render(key)
+                size = surface.get_width() * surface.get_height() * surface.get_bytesize()
+                if self.bytes + size > self.budget:
+                    return len(self.surfaces)
+                self._store(key, surface)
+        return len(self.surfaces)
+
+    # ---------------- Statistics ---------------- #
+
+    @property
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def report(self):
+        return (f"sprite cache: {self.hit_rate:.1%} hits ({self.hits}/{self.hits + self.misses}), "
+                f"{len(self.surfaces)} surfaces, {self.bytes / 1048576:.1f} MB, {self.evictions} evictions")